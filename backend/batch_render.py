@@ -0,0 +1,202 @@
+import os
+import glob
+import json
+import time
+import queue
+import tempfile
+import subprocess
+import multiprocessing
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import ffmpeg
+from .edit_graph import compile_edit_graph
+from .media_cache import media_cache
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mkv', '.mov')
+BATCH_OUTPUT_DIR = "Edited/batch"
+BATCH_REPORT_FILE = "batch_report.json"
+THREADS_PER_JOB = 4
+
+def load_edit_recipe(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_edit_recipe(path, recipe):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(recipe, f, indent=4)
+
+def collect_inputs(source):
+    """Video files in the folder ``source``, or the files matching ``source`` as a glob."""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS))
+
+def plan_jobs(jobs=None, threads=None, cpu_count=None):
+    """Split the machine's cores into ``jobs`` concurrent renders of ``threads`` threads each.
+
+    With nothing given, jobs get ``THREADS_PER_JOB`` threads each, so a
+    16-core box runs 4 jobs x 4 threads rather than one encoder per file
+    all fighting over every core.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if threads is None:
+        threads = max(1, cpu_count // jobs) if jobs else min(THREADS_PER_JOB, cpu_count)
+    if jobs is None:
+        jobs = max(1, cpu_count // threads)
+    return max(1, int(jobs)), max(1, int(threads))
+
+def render_job(video_path, output_path, recipe, threads, progress_queue=None):
+    """Render one file in a worker process; reports ``(video_path, percent)`` on ``progress_queue``."""
+    start = time.monotonic()
+    result = {'input': video_path, 'output': output_path, 'ok': False, 'seconds': 0.0, 'error': None}
+    try:
+        probe = media_cache.probe(video_path)
+        duration = float(probe['format'].get('duration', 0))
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        args = (compile_edit_graph(video_path, output_path, recipe, probe=probe, threads=threads)
+                .global_args('-progress', 'pipe:1', '-nostats', '-loglevel', 'error')
+                .overwrite_output().compile())
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=log)
+            try:
+                last_percent = -10
+                for line in process.stdout:
+                    key, _, value = line.decode(errors='replace').strip().partition('=')
+                    if key == 'out_time_us' and value.isdigit() and duration and progress_queue is not None:
+                        percent = min(100, int(int(value) / 1e6 / duration * 100))
+                        if percent >= last_percent + 10:
+                            last_percent = percent
+                            progress_queue.put((video_path, percent))
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+            if returncode != 0:
+                log.seek(0)
+                raise RuntimeError(log.read().decode(errors='replace').strip() or f"ffmpeg exited with {returncode}")
+        result['ok'] = True
+    except ffmpeg.Error as e:
+        result['error'] = e.stderr.decode() if e.stderr else str(e)
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = round(time.monotonic() - start, 3)
+    if result['error']:
+        logging.error(f"Batch render failed for {video_path}: {result['error']}")
+    return result
+
+class BatchRenderer:
+    """Apply one edit recipe to many files on a process pool.
+
+    Each job is an ffmpeg process capped at ``threads`` threads and at most
+    ``jobs`` of them run at once. Per-file progress comes back through
+    ``progress_callback`` and overall progress through ``progress_updater``,
+    both on the calling thread. ``run`` returns a summary that is also
+    written to ``batch_report.json`` in the output folder.
+    """
+
+    def __init__(self, jobs=None, threads=None, output_dir=BATCH_OUTPUT_DIR):
+        self.jobs, self.threads = plan_jobs(jobs, threads)
+        self.output_dir = output_dir
+
+    def output_paths(self, inputs):
+        """Map each input to an output in ``output_dir``, numbering names that would collide.
+
+        ``a.mp4`` and ``a.webm``, or two ``clip.mp4`` from different folders,
+        render to ``a.mp4`` and ``a_2.mp4`` instead of overwriting each other.
+        """
+        outputs = {}
+        taken = set()
+        for video_path in inputs:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            name, number = f"{stem}.mp4", 1
+            while name.lower() in taken:
+                number += 1
+                name = f"{stem}_{number}.mp4"
+            taken.add(name.lower())
+            outputs[video_path] = os.path.join(self.output_dir, name)
+        return outputs
+
+    def run(self, recipe, inputs, progress_callback=None, progress_updater=None):
+        inputs = list(dict.fromkeys(inputs))
+        outputs = self.output_paths(inputs)
+        start = time.monotonic()
+        results = []
+        if progress_callback:
+            progress_callback(f"Batch rendering {len(inputs)} videos with {self.jobs} jobs x {self.threads} threads")
+        # Probe everything up front in parallel; the workers then read the results from the on-disk cache
+        media_cache.warm(inputs)
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, \
+                ProcessPoolExecutor(max_workers=self.jobs, mp_context=context) as executor:
+            progress_queue = manager.Queue()
+            futures = {executor.submit(render_job, video_path, outputs[video_path], recipe,
+                                       self.threads, progress_queue): video_path for video_path in inputs}
+            pending = set(futures)
+            partial = {}
+            last_overall = None
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    while True:
+                        try:
+                            video_path, percent = progress_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        partial[video_path] = percent
+                        if progress_callback:
+                            progress_callback(f"{os.path.basename(video_path)}: {percent}%")
+                    for future in done:
+                        video_path = futures[future]
+                        partial.pop(video_path, None)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {'input': video_path, 'output': outputs[video_path], 'ok': False,
+                                      'seconds': 0.0, 'error': str(e)}
+                        results.append(result)
+                        if progress_callback:
+                            status = f"done in {result['seconds']:.1f}s" if result['ok'] else f"failed: {result['error']}"
+                            progress_callback(f"[{len(results)}/{len(inputs)}] {os.path.basename(video_path)} {status}")
+                    overall = (len(results) + sum(partial.values()) / 100) / len(inputs) * 100
+                    if progress_updater and overall != last_overall:
+                        last_overall = overall
+                        progress_updater(overall)
+            except BaseException:
+                # Stop queued files; the ones already rendering finish before the pool closes
+                for future in pending:
+                    future.cancel()
+                raise
+
+        results.sort(key=lambda result: inputs.index(result['input']))
+        seconds = time.monotonic() - start
+        job_seconds = sum(result['seconds'] for result in results)
+        summary = {
+            'recipe': recipe,
+            'jobs': self.jobs,
+            'threads_per_job': self.threads,
+            'total': len(results),
+            'succeeded': sum(1 for result in results if result['ok']),
+            'failed': sum(1 for result in results if not result['ok']),
+            'seconds': round(seconds, 3),
+            'job_seconds': round(job_seconds, 3),
+            'speedup': round(job_seconds / seconds, 2) if seconds else 0.0,
+            'results': results,
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, BATCH_REPORT_FILE)
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=4)
+        summary['report'] = report_path
+        logging.info(f"Batch render finished: {summary['succeeded']}/{summary['total']} in {seconds:.1f}s")
+        if progress_callback:
+            progress_callback(f"Batch render finished: {summary['succeeded']} succeeded, {summary['failed']} failed "
+                              f"in {seconds:.1f}s. Report saved to {report_path}")
+        return summary
@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from .utils import clean_title
+from .file_manager import load_list
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+CATALOGUE_DB = "catalogue.db"
+METADATA_FIELDS = ("duration", "view_count", "channel", "availability")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    duration REAL,
+    view_count INTEGER,
+    channel TEXT,
+    availability TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_search_results_norm_title ON search_results(norm_title);
+
+CREATE TABLE IF NOT EXISTS downloaded_videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_downloaded_videos_norm_title ON downloaded_videos(norm_title);
+
+CREATE TABLE IF NOT EXISTS query_stats (
+    query TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL DEFAULT 0,
+    total_new INTEGER NOT NULL DEFAULT 0,
+    expected_yield REAL NOT NULL DEFAULT 0,
+    empty_streak INTEGER NOT NULL DEFAULT 0,
+    last_run REAL,
+    next_run REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def normalize_title(title):
+    return clean_title(title).lower()
+
+class CatalogueStore:
+    """SQLite-backed catalogue of search results and downloaded videos.
+
+    Every write runs in its own transaction, so a crash can never leave the
+    catalogue half-written the way a truncated JSON file could.
+    """
+
+    def __init__(self, db_path=CATALOGUE_DB):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(search_results)")}
+        for column, column_type in (("duration", "REAL"), ("view_count", "INTEGER"),
+                                    ("channel", "TEXT"), ("availability", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE search_results ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def transaction(self):
+        with self._lock, self._conn:
+            yield self._conn
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def search_results(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, url, duration, view_count, channel, availability FROM search_results ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def downloaded_videos(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT title, url, path FROM downloaded_videos ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def search_result_urls(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM search_results")}
+
+    def downloaded_urls(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM downloaded_videos")}
+
+    def is_downloaded(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM downloaded_videos WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def find_by_title(self, title):
+        norm_title = normalize_title(title)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, url FROM search_results WHERE norm_title = ? "
+                "UNION ALL SELECT title, url FROM downloaded_videos WHERE norm_title = ?",
+                (norm_title, norm_title)).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_search_results(self, videos):
+        rows = [(video['url'], video['title'], normalize_title(video['title']),
+                 *(video.get(field) for field in METADATA_FIELDS)) for video in videos]
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO search_results (url, title, norm_title, duration, view_count, channel, availability) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET title = excluded.title, norm_title = excluded.norm_title, "
+                "duration = coalesce(excluded.duration, duration), view_count = coalesce(excluded.view_count, view_count), "
+                "channel = coalesce(excluded.channel, channel), availability = coalesce(excluded.availability, availability)",
+                rows)
+        return len(rows)
+
+    def mark_downloaded(self, url, title, path):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO downloaded_videos (url, title, norm_title, path) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET title = excluded.title, norm_title = excluded.norm_title, "
+                "path = excluded.path",
+                (url, title, normalize_title(title), path))
+            conn.execute("DELETE FROM search_results WHERE url = ?", (url,))
+
+    def query_stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM query_stats").fetchall()
+        return {row['query']: dict(row) for row in rows}
+
+    def query_stat(self, query):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM query_stats WHERE query = ?", (query,)).fetchone()
+        return dict(row) if row else None
+
+    def save_query_stats(self, stats):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO query_stats (query, runs, total_new, expected_yield, empty_streak, last_run, next_run) "
+                "VALUES (:query, :runs, :total_new, :expected_yield, :empty_streak, :last_run, :next_run) "
+                "ON CONFLICT(query) DO UPDATE SET runs = excluded.runs, total_new = excluded.total_new, "
+                "expected_yield = excluded.expected_yield, empty_streak = excluded.empty_streak, "
+                "last_run = excluded.last_run, next_run = excluded.next_run", stats)
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    def migrate_from_json(self, search_results_file, downloaded_file):
+        """Import the legacy JSON catalogue once; later calls are no-ops."""
+        if self.get_meta("json_migrated"):
+            return False
+        search_results = load_list(search_results_file)
+        downloaded_list = load_list(downloaded_file)
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO downloaded_videos (url, title, norm_title, path) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO NOTHING",
+                [(video['url'], video['title'], normalize_title(video['title']), video.get('path'))
+                 for video in downloaded_list])
+            conn.executemany(
+                "INSERT INTO search_results (url, title, norm_title) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO NOTHING",
+                [(video['url'], video['title'], normalize_title(video['title']))
+                 for video in search_results])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1') "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value")
+        if search_results or downloaded_list:
+            logging.info(f"Migrated {len(search_results)} search results and {len(downloaded_list)} "
+                         f"downloaded videos from JSON into {os.path.abspath(self.db_path)}")
+        return True
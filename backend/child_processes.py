@@ -0,0 +1,49 @@
+import threading
+import subprocess
+import logging
+import ffmpeg
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+_processes = set()
+_lock = threading.Lock()
+_stopped = False
+
+class ProcessesStopped(RuntimeError):
+    pass
+
+def spawn(args, **kwargs):
+    """``subprocess.Popen`` for ffmpeg children that ``kill_all`` can stop.
+
+    Raises ``ProcessesStopped`` once ``kill_all`` has run, so a job that
+    chains several encodes does not start the next one.
+    """
+    global _processes
+    with _lock:
+        if _stopped:
+            raise ProcessesStopped("ffmpeg processes have been stopped")
+        _processes = {process for process in _processes if process.poll() is None}
+        process = subprocess.Popen(args, **kwargs)
+        _processes.add(process)
+    return process
+
+def run_ffmpeg(stream):
+    """Drop-in for ``ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)``."""
+    process = spawn(ffmpeg.compile(stream, overwrite_output=True), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    if process.returncode:
+        raise ffmpeg.Error('ffmpeg', out, err)
+    return out, err
+
+def kill_all():
+    """Kill every running child and refuse new ones; called when the app closes."""
+    global _stopped
+    with _lock:
+        _stopped = True
+        running = [process for process in _processes if process.poll() is None]
+        _processes.clear()
+    for process in running:
+        process.kill()
+    if running:
+        logging.info(f"Killed {len(running)} ffmpeg processes at exit")
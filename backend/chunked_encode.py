@@ -0,0 +1,94 @@
+import os
+import bisect
+import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+from .keyframes import probe_keyframes
+from .media_cache import media_cache
+from .child_processes import run_ffmpeg
+from .edit_graph import apply_video_recipe, compile_edit_graph
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+MIN_CHUNK_SECONDS = 10
+
+def plan_chunks(keyframes, duration, chunks, min_seconds=MIN_CHUNK_SECONDS):
+    """Split ``[0, duration]`` into up to ``chunks`` ranges that start on keyframes.
+
+    Each cut is the keyframe closest to an even share of the duration, so
+    every chunk decodes from a clean keyframe; chunks shorter than
+    ``min_seconds`` are not worth a process of their own and are merged.
+    """
+    chunks = max(1, min(int(chunks), int(duration // max(min_seconds, 1e-6)) or 1))
+    cuts = []
+    for i in range(1, chunks):
+        target = duration * i / chunks
+        pos = bisect.bisect_left(keyframes, target)
+        nearby = keyframes[max(0, pos - 1):pos + 1]
+        if not nearby:
+            continue
+        cut = min(nearby, key=lambda keyframe: abs(keyframe - target))
+        if cut > (cuts[-1] if cuts else 0.0) + 1e-6 and cut < duration - 1e-6:
+            cuts.append(cut)
+    bounds = [0.0] + cuts + [duration]
+    return list(zip(bounds, bounds[1:]))
+
+def _encode_chunk(video_path, output_path, recipe, video_info, start, end, threads, output_args):
+    source = ffmpeg.input(video_path, ss=f"{start:.6f}", t=f"{end - start:.6f}", threads=threads)
+    video_stream = apply_video_recipe(source.video, recipe, int(video_info['width']), int(video_info['height']))
+    stream = ffmpeg.output(video_stream, output_path, an=None, threads=threads, **output_args)
+    stream = stream.global_args('-filter_complex_threads', str(threads))
+    run_ffmpeg(stream)
+    return output_path
+
+def chunked_encode(video_path, output_path, recipe, chunks=None, probe=None, progress_callback=None):
+    """Render ``recipe`` onto ``video_path`` as ``chunks`` encodes running side by side.
+
+    The source is cut at keyframes, every chunk is filtered and encoded by
+    its own ffmpeg process with an even share of the cores, and the encoded
+    chunks are joined with the concat demuxer and stream copy. Audio, either
+    the original track or the recipe's ``audio_path``, is added over the
+    whole result in the final mux so it has no seams. Overlay and text
+    positions are static, so they land on the same pixels in every chunk.
+    Raises ``ffmpeg.Error`` if any step fails.
+    """
+    cpu_count = os.cpu_count() or 1
+    chunks = chunks or cpu_count
+    probe = probe or media_cache.probe(video_path)
+    duration, keyframes = probe_keyframes(video_path)
+    boundaries = plan_chunks(keyframes, duration, chunks)
+    if len(boundaries) == 1:
+        stream = compile_edit_graph(video_path, output_path, recipe, probe=probe)
+        run_ffmpeg(stream)
+        return 1
+
+    video_info = next(stream for stream in probe['streams'] if stream['codec_type'] == 'video')
+    threads = max(1, cpu_count // len(boundaries))
+    video_args = {'vcodec': 'libx264', 'pix_fmt': 'yuv420p'}
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(prefix="chunks_", dir=output_dir) as temp_dir:
+        chunk_paths = [os.path.join(temp_dir, f"chunk_{i:03d}.mp4") for i in range(len(boundaries))]
+        with ThreadPoolExecutor(max_workers=len(boundaries), thread_name_prefix="chunk") as executor:
+            futures = [executor.submit(_encode_chunk, video_path, chunk_path, recipe, video_info, start, end,
+                                       threads, video_args)
+                       for chunk_path, (start, end) in zip(chunk_paths, boundaries)]
+            for i, future in enumerate(futures):
+                future.result()
+                if progress_callback:
+                    progress_callback(f"Encoded chunk {i + 1}/{len(boundaries)}")
+
+        concat_list = os.path.join(temp_dir, "chunks.txt")
+        with open(concat_list, 'w') as f:
+            f.writelines(f"file '{path}'\n" for path in chunk_paths)
+        video = ffmpeg.input(concat_list, f='concat', safe=0).video
+        mux_args = {'vcodec': 'copy', 'acodec': 'aac'}
+        if recipe.get('audio_path'):
+            audio = ffmpeg.input(recipe['audio_path'], stream_loop=-1).audio
+            stream = ffmpeg.output(video, audio, output_path, shortest=None, **mux_args)
+        else:
+            stream = ffmpeg.output(video, ffmpeg.input(video_path)['a?'], output_path, **mux_args)
+        run_ffmpeg(stream)
+    logging.info(f"Chunked encode of {video_path} in {len(boundaries)} chunks x {threads} threads: {output_path}")
+    return len(boundaries)
@@ -0,0 +1,89 @@
+import os
+import logging
+from functools import lru_cache
+import numpy as np
+import ffmpeg
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+LUT_CACHE_DIR = ".cache/luts"
+LUT_SIZE = 33
+GRADING_MODES = ("auto", "eq", "lut")
+
+# BT.709 luma weights, matching how HD sources are encoded
+LUMA_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+def normalize_params(color_params):
+    """Return ``(brightness, contrast, saturation)`` from a dict or tuple, rounded so equal presets share a LUT."""
+    if isinstance(color_params, dict):
+        color_params = (color_params.get('brightness', 1.0), color_params.get('contrast', 1.0),
+                        color_params.get('saturation', 1.0))
+    return tuple(round(float(value), 3) for value in color_params)
+
+def grade(rgb, brightness=1.0, contrast=1.0, saturation=1.0):
+    """Apply the grade to an ``(..., 3)`` array of RGB values in 0..1."""
+    rgb = rgb * brightness
+    luma = rgb @ LUMA_WEIGHTS
+    chroma = (rgb - luma[..., None]) * saturation
+    luma = (luma - 0.5) * contrast + 0.5
+    return np.clip(luma[..., None] + chroma, 0.0, 1.0)
+
+def build_lut(brightness=1.0, contrast=1.0, saturation=1.0, size=LUT_SIZE):
+    """Sample the grade on a ``size``³ grid, red varying fastest as .cube files expect."""
+    axis = np.linspace(0.0, 1.0, size)
+    blue, green, red = np.meshgrid(axis, axis, axis, indexing='ij')
+    rgb = np.stack([red, green, blue], axis=-1).reshape(-1, 3)
+    return grade(rgb, brightness, contrast, saturation)
+
+def write_cube(path, lut, size=LUT_SIZE, title="video_app grade"):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(f'TITLE "{title}"\nLUT_3D_SIZE {size}\n')
+        np.savetxt(f, lut, fmt='%.6f')
+    os.replace(tmp_path, path)
+
+@lru_cache(maxsize=64)
+def lut_path(brightness, contrast, saturation, size=LUT_SIZE, cache_dir=LUT_CACHE_DIR):
+    """Path of the .cube file for this grade, generated on first use and reused afterwards."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"grade_b{brightness:g}_c{contrast:g}_s{saturation:g}_{size}.cube")
+    if not os.path.exists(path):
+        write_cube(path, build_lut(brightness, contrast, saturation, size), size)
+        logging.info(f"Generated color LUT {path}")
+    return path
+
+def eq_params(brightness=1.0, contrast=1.0, saturation=1.0):
+    """Express the grade as ``eq`` options.
+
+    Scaling RGB by ``brightness`` scales luma and both chroma planes alike,
+    so the whole grade folds into one affine map on luma plus a chroma gain
+    and never leaves YUV.
+    """
+    return {
+        'contrast': round(contrast * brightness, 4),
+        'brightness': round(0.5 * contrast * (brightness - 1), 4),
+        'saturation': round(saturation * brightness, 4),
+    }
+
+def apply_grading(video_stream, color_params, mode="auto"):
+    """Add the grade to an ffmpeg-python stream as native filters.
+
+    ``eq`` works on the YUV planes in place and costs about as much as a
+    plain encode; ``lut`` applies the grade in RGB through a cached
+    ``lut3d`` cube, which clips per channel like an editor would but
+    runs at about half the speed. ``auto`` picks ``eq`` unless a parameter is out
+    of its range.
+    """
+    if mode not in GRADING_MODES:
+        raise ValueError(f"Unknown grading mode: {mode}")
+    brightness, contrast, saturation = normalize_params(color_params)
+    if (brightness, contrast, saturation) == (1.0, 1.0, 1.0):
+        return video_stream
+    params = eq_params(brightness, contrast, saturation)
+    if mode == "auto":
+        mode = "eq" if abs(params['brightness']) <= 1.0 and 0.0 <= params['saturation'] <= 3.0 else "lut"
+    if mode == "eq":
+        return ffmpeg.filter(video_stream, 'eq', **params)
+    return ffmpeg.filter(video_stream, 'lut3d', file=lut_path(brightness, contrast, saturation),
+                         interp='tetrahedral')
@@ -0,0 +1,51 @@
+import numpy as np
+from scipy import sparse
+
+def deduplicate_page(videos, seen_urls, downloaded_index, search_index, threshold=0.8):
+    """Split a whole page of search results into ``(new_videos, excluded)``.
+
+    URLs are checked against ``seen_urls`` (a set), titles are scored against
+    both title indexes with one sparse similarity product each, and
+    near-duplicates inside the page itself are dropped in favour of the
+    earliest result. ``excluded`` holds ``(video, reason)`` pairs.
+    """
+    excluded = []
+    candidates = []
+    page_urls = set()
+    for video in videos:
+        if video['url'] in seen_urls or video['url'] in page_urls:
+            excluded.append((video, "already exists"))
+            continue
+        page_urls.add(video['url'])
+        candidates.append(video)
+    if not candidates:
+        return [], excluded
+
+    titles = [video['title'] for video in candidates]
+    similar = np.zeros(len(candidates), dtype=bool)
+    page_scores = None
+    for index in (downloaded_index, search_index):
+        if len(index):
+            scores, _, batch_scores = index.similarity_matrices(titles, threshold)
+            if index is search_index:
+                page_scores = batch_scores
+            if scores.shape[1]:
+                similar |= scores.max(axis=1).toarray().ravel() >= threshold
+
+    if page_scores is None:
+        _, _, page_scores = search_index.similarity_matrices(titles, threshold)
+    earlier_matches = sparse.tril(page_scores >= threshold, k=-1).tocsr()
+
+    new_videos = []
+    kept = np.zeros(len(candidates), dtype=bool)
+    for row, video in enumerate(candidates):
+        if similar[row]:
+            excluded.append((video, "similar title"))
+            continue
+        matches = earlier_matches.indices[earlier_matches.indptr[row]:earlier_matches.indptr[row + 1]]
+        if kept[matches].any():
+            excluded.append((video, "similar to another result on this page"))
+            continue
+        kept[row] = True
+        new_videos.append(video)
+    return new_videos, excluded
@@ -0,0 +1,159 @@
+import time
+import queue
+import random
+import threading
+import logging
+from .utils import clean_title
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+DOWNLOAD_WORKERS = 3
+DOWNLOAD_RETRIES = 3
+RETRY_BACKOFF = 2.0
+BANDWIDTH_CAP = None  # bytes per second shared by all workers, None for unlimited
+
+PERMANENT_ERRORS = (
+    "private video", "video unavailable", "not available", "members-only",
+    "sign in to confirm", "copyright", "has been removed", "unsupported url",
+)
+
+def is_transient_error(message):
+    message = message.lower()
+    return not any(marker in message for marker in PERMANENT_ERRORS)
+
+class DownloadScheduler:
+    """Download search results on a pool of yt-dlp workers.
+
+    Each finished download is committed to the catalogue on its own, so a
+    crash mid-batch keeps everything downloaded so far. Transient failures
+    are retried with exponential backoff. ``bandwidth_cap`` is split evenly
+    between the workers a run starts through yt-dlp's ``ratelimit`` option. Progress from the
+    workers is relayed through ``progress_callback`` on the calling thread.
+    With ``clip`` set to ``download_sections`` keyword arguments, only those
+    sections are fetched and every part is reported as its own video.
+    """
+
+    def __init__(self, downloader, workers=DOWNLOAD_WORKERS, retries=DOWNLOAD_RETRIES,
+                 backoff=RETRY_BACKOFF, bandwidth_cap=BANDWIDTH_CAP, clip=None):
+        self.downloader = downloader
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.bandwidth_cap = bandwidth_cap
+        self.clip = clip
+        self._lock = threading.Lock()
+        self._active_workers = self.workers
+
+    def _ydl_opts(self, worker_id, title, messages):
+        last_percent = [-10]
+
+        def hook(d):
+            if d['status'] == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if total:
+                    percent = int(d.get('downloaded_bytes', 0) * 100 / total)
+                    if percent >= last_percent[0] + 10:
+                        last_percent[0] = percent
+                        messages.put(("status", f"[worker {worker_id}] {title}: {percent}%"))
+            elif d['status'] == 'finished':
+                messages.put(("status", f"[worker {worker_id}] {title}: download finished, merging"))
+
+        opts = {'progress_hooks': [hook]}
+        if self.bandwidth_cap:
+            # Split between the threads this run started, which is fewer than self.workers for small batches
+            opts['ratelimit'] = max(1, int(self.bandwidth_cap / self._active_workers))
+        return opts
+
+    def _fetch(self, worker_id, video, title, messages):
+        extra_opts = self._ydl_opts(worker_id, title, messages)
+        if self.clip:
+            return self.downloader.download_sections(
+                video['url'], title, video.get('duration'), extra_opts=extra_opts, **self.clip)
+        success, message, video_path = self.downloader.download_video(video['url'], title, extra_opts=extra_opts)
+        return success, message, [(video_path, title)] if success else []
+
+    def _download_with_retry(self, worker_id, video, title, messages):
+        url = video['url']
+        for attempt in range(self.retries + 1):
+            success, message, parts = self._fetch(worker_id, video, title, messages)
+            if success or not is_transient_error(message) or attempt == self.retries:
+                return success, message, parts
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+            messages.put(("status", f"[worker {worker_id}] {message} - retrying in {delay:.1f}s"))
+            logging.warning(f"Retrying download of {url} in {delay:.1f}s: {message}")
+            time.sleep(delay)
+
+    def run(self, candidates, max_downloads=1, progress_callback=None, progress_updater=None, on_downloaded=None):
+        store = self.downloader.store
+        downloaded_index = self.downloader.downloaded_index
+        search_index = self.downloader.search_index
+        candidates = iter(candidates)
+        messages = queue.Queue()
+        state = {'done': 0, 'in_flight': 0, 'titles': set(), 'stopped': False}
+        video_paths = []
+
+        def claim():
+            with self._lock:
+                while not state['stopped'] and state['done'] + state['in_flight'] < max_downloads:
+                    video = next(candidates, None)
+                    if video is None:
+                        return None
+                    if store.is_downloaded(video['url']):
+                        messages.put(("status", f"Skipping (already downloaded): {video['title']}"))
+                        continue
+                    cleaned_title = clean_title(video['title'])
+                    if cleaned_title in state['titles'] or downloaded_index.is_similar(video['title']):
+                        messages.put(("status", f"Skipping (similar title): {video['title']}"))
+                        continue
+                    state['in_flight'] += 1
+                    state['titles'].add(cleaned_title)
+                    return video, cleaned_title
+                return None
+
+        def worker(worker_id):
+            while True:
+                claimed = claim()
+                if claimed is None:
+                    return
+                video, cleaned_title = claimed
+                success, message, parts = self._download_with_retry(worker_id, video, cleaned_title, messages)
+                with self._lock:
+                    state['in_flight'] -= 1
+                    if success:
+                        store.mark_downloaded(video['url'], cleaned_title, parts[0][0])
+                        search_index.remove(video['url'])
+                        downloaded_index.add(video['url'], cleaned_title)
+                        state['done'] += 1
+                        video_paths.extend(parts)
+                    else:
+                        state['titles'].discard(cleaned_title)
+                    done = state['done']
+                messages.put(("status", f"[worker {worker_id}] {message}"))
+                if success:
+                    messages.put(("progress", done / max_downloads * 100))
+                    if on_downloaded:
+                        for part_path, part_title in parts:
+                            on_downloaded(part_path, part_title)
+
+        self._active_workers = max(1, min(self.workers, max_downloads))
+        threads = [threading.Thread(target=worker, args=(n + 1,), name=f"download-{n + 1}", daemon=True)
+                   for n in range(self._active_workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads) or not messages.empty():
+                try:
+                    kind, payload = messages.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if kind == "status" and progress_callback:
+                    progress_callback(payload)
+                elif kind == "progress" and progress_updater:
+                    progress_updater(payload)
+        except BaseException:
+            # The caller gave up (e.g. the job was cancelled): let in-flight downloads finish but start no more
+            with self._lock:
+                state['stopped'] = True
+            raise
+        return video_paths
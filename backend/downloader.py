@@ -2,48 +2,102 @@ import yt_dlp
 import os
 import logging
 from .utils import clean_title
-from .file_manager import load_list, save_list, is_title_similar
+from .title_index import TitleIndex
+from .dedup import deduplicate_page
+from .search_fanout import fan_out
+from .search_cache import SearchCache
+from .query_scheduler import QueryScheduler
+from .video_filter import VideoFilter
+from .download_scheduler import DownloadScheduler, DOWNLOAD_WORKERS, BANDWIDTH_CAP
+from .catalogue_store import CatalogueStore, CATALOGUE_DB
 
 logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 SEARCH_RESULTS_FILE = "search_results.json"
 DOWNLOADED_FILE = "downloaded_videos.json"
+SEARCH_CONCURRENCY = 4
+SEARCH_TIMEOUT = 60
+VIDEO_FORMAT = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+
+def plan_sections(duration, max_duration=60, max_parts=None):
+    num_parts = int(duration // max_duration) + (1 if duration % max_duration > 0 else 0)
+    if max_parts:
+        num_parts = min(num_parts, max_parts)
+    return [(i * max_duration, min((i + 1) * max_duration, duration)) for i in range(num_parts)]
+
+def download_status(d):
+    """One-line summary of a yt-dlp progress hook dict."""
+    downloaded = d.get('downloaded_bytes', 0)
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    if d['status'] == 'downloading' and total:
+        return f"Downloading: {downloaded * 100 / total:.0f}% of {total / 1e6:.1f} MB"
+    return f"Downloading: {d['status']} {downloaded} bytes"
 
 class Downloader:
-    def __init__(self):
+    def __init__(self, store=None, ydl_factory=yt_dlp.YoutubeDL, search_cache=None):
+        self.ydl_factory = ydl_factory
+        self.search_cache = search_cache or SearchCache()
         self.search_results_file = SEARCH_RESULTS_FILE
         self.downloaded_file = DOWNLOADED_FILE
+        self.store = store or CatalogueStore(CATALOGUE_DB)
+        self.store.migrate_from_json(self.search_results_file, self.downloaded_file)
+        self.downloaded_index = TitleIndex((video['url'], video['title']) for video in self.store.downloaded_videos())
+        self.search_index = TitleIndex((video['url'], video['title']) for video in self.store.search_results())
+        self.query_scheduler = QueryScheduler(self.store)
+
+    def search_youtube(self, query, results_length=10, progress_callback=None, raise_errors=False, cached_queries=None,
+                       timeout=SEARCH_TIMEOUT):
+        """Search results for ``query``; a failed search returns ``[]`` unless ``raise_errors`` is set.
 
-    def search_youtube(self, query, results_length=10, progress_callback=None):
+        ``query`` is added to the ``cached_queries`` set when the results come from the search cache.
+        """
+        cached = self.search_cache.get(query, results_length)
+        if cached is not None:
+            if cached_queries is not None:
+                cached_queries.add(query)
+            return cached
         ydl_opts = {
             'quiet': True,
             'extract_flat': True,
             'force_generic_extractor': True,
             'playlistend': results_length,
+            'socket_timeout': timeout,
         }
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self.ydl_factory(ydl_opts) as ydl:
                 result = ydl.extract_info(f"ytsearch{results_length}:{query}", download=False)
                 entries = result.get('entries', [])
-                return [{"title": entry['title'], "url": entry['url']} for entry in entries[:results_length]]
+                results = [{
+                    "title": entry['title'],
+                    "url": entry['url'],
+                    "duration": entry.get('duration'),
+                    "view_count": entry.get('view_count'),
+                    "channel": entry.get('channel') or entry.get('uploader'),
+                    "availability": entry.get('availability'),
+                } for entry in entries[:results_length]]
+            self.search_cache.put(query, results_length, results)
+            return results
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Error searching for '{query}': {str(e)}")
             logging.error(f"Search failed for '{query}': {str(e)}")
+            if raise_errors:
+                raise
             return []
 
-    def download_video(self, url, title, progress_callback=None):
+    def download_video(self, url, title, progress_callback=None, extra_opts=None, output_dir="videos"):
         ydl_opts = {
-            'outtmpl': f'videos/{title}.%(ext)s',
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            'outtmpl': f'{output_dir}/{title}.%(ext)s',
+            'format': VIDEO_FORMAT,
             'merge_output_format': 'mp4',
             'quiet': True,
+            **(extra_opts or {}),
         }
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self.ydl_factory(ydl_opts) as ydl:
                 ydl.download([url])
-            video_path = f"videos/{title}.mp4"
+            video_path = f"{output_dir}/{title}.mp4"
             if os.path.exists(video_path):
                 return True, f"Downloaded: {title}", video_path
             else:
@@ -51,7 +105,53 @@ class Downloader:
         except Exception as e:
             return False, f"Error downloading {title}: {str(e)}", None
 
-    def download_from_url(self, url, resolution, extension, output_dir="videos", progress_callback=None):
+    def download_sections(self, url, title, duration=None, max_duration=60, max_parts=None, output_dir="videos",
+                          accurate_cuts=False, progress_callback=None, extra_opts=None):
+        """Download only ``max_duration``-second windows, written directly as the split parts."""
+        try:
+            if duration is None:
+                with self.ydl_factory({'quiet': True, 'noplaylist': True}) as ydl:
+                    duration = ydl.extract_info(url, download=False).get('duration')
+            if not duration:
+                return False, f"Error: Unknown duration for {title}", []
+            if duration <= max_duration:
+                success, message, video_path = self.download_video(url, title, progress_callback, extra_opts, output_dir)
+                return success, message, [(video_path, title)] if success else []
+
+            os.makedirs(output_dir, exist_ok=True)
+            sections = plan_sections(duration, max_duration, max_parts)
+            parts = []
+            for i, (start_time, end_time) in enumerate(sections):
+                split_title = f"{title} PART-{i + 1}"
+                split_path = f"{output_dir}/{split_title}.mp4"
+                ydl_opts = {
+                    'outtmpl': f'{output_dir}/{split_title}.%(ext)s',
+                    'format': VIDEO_FORMAT,
+                    'merge_output_format': 'mp4',
+                    'quiet': True,
+                    'download_ranges': yt_dlp.utils.download_range_func(None, [(start_time, end_time)]),
+                    'force_keyframes_at_cuts': accurate_cuts,
+                    **(extra_opts or {}),
+                }
+                with self.ydl_factory(ydl_opts) as ydl:
+                    ydl.download([url])
+                if not os.path.exists(split_path):
+                    return False, f"Error: Section {i + 1} not found for {title}", parts
+                parts.append((split_path, split_title))
+                if progress_callback:
+                    progress_callback(f"Downloaded section {i + 1}/{len(sections)}: {split_title}")
+            logging.info(f"Downloaded {len(parts)} sections of {url} as '{title}'")
+            return True, f"Downloaded {len(parts)} sections of {title}", parts
+        except Exception as e:
+            logging.error(f"Section download failed for {url}: {str(e)}")
+            return False, f"Error downloading sections of {title}: {str(e)}", []
+
+    def download_from_url(self, url, resolution, extension, output_dir="videos", progress_callback=None, clip_duration=None,
+                          download_progress=None):
+        """Download ``url``; yt-dlp's per-chunk progress goes to ``download_progress`` (default ``progress_callback``)."""
+        if clip_duration:
+            return self._download_clips_from_url(url, output_dir, clip_duration, progress_callback)
+        download_progress = download_progress or progress_callback
         resolution_map = {
             "best": "bestvideo+bestaudio/best",
             "1080p": "bestvideo[height<=1080]+bestaudio/best",
@@ -67,10 +167,10 @@ class Downloader:
             'noplaylist': True,
             'quiet': True,
             'no_warnings': True,
-            'progress_hooks': [lambda d: progress_callback(f"Downloading: {d['status']} {d.get('downloaded_bytes', 0)} bytes") if progress_callback else None]
+            'progress_hooks': [lambda d: download_progress(download_status(d)) if download_progress else None]
         }
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self.ydl_factory(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=True)
                 filename = ydl.prepare_filename(info)
                 base, _ = os.path.splitext(filename)
@@ -95,50 +195,100 @@ class Downloader:
             logging.error(f"Download from URL failed: {error_msg}")
             return False, error_msg
 
-    def populate_search_results(self, search_queries, results_length=10, progress_callback=None, progress_updater=None):
-        downloaded_list = load_list(self.downloaded_file)
-        search_results = load_list(self.search_results_file)
-        downloaded_urls = [video['url'] for video in downloaded_list]
-        downloaded_titles = [video['title'] for video in downloaded_list]
-        search_result_urls = [video['url'] for video in search_results]
-        search_result_titles = [video['title'] for video in search_results]
+    def _download_clips_from_url(self, url, output_dir, clip_duration, progress_callback=None):
+        try:
+            with self.ydl_factory({'quiet': True, 'noplaylist': True}) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            error_msg = f"Error downloading video: {str(e)}"
+            if progress_callback:
+                progress_callback(error_msg)
+            logging.error(f"Download from URL failed: {error_msg}")
+            return False, error_msg
+        success, message, parts = self.download_sections(
+            url, clean_title(info.get('title', 'video')), info.get('duration'), clip_duration,
+            output_dir=output_dir, progress_callback=progress_callback)
+        if progress_callback:
+            progress_callback(message)
+        if not success:
+            logging.error(f"Download from URL failed: {message}")
+            return False, message
+        return True, parts[0][0]
+
+    def populate_search_results(self, search_queries, results_length=10, progress_callback=None, progress_updater=None,
+                                concurrency=SEARCH_CONCURRENCY, query_timeout=SEARCH_TIMEOUT, schedule=False, target_new=None):
+        seen_urls = self.store.downloaded_urls() | self.store.search_result_urls()
+        search_queries = list(search_queries)
+        if schedule:
+            total_queries = len(search_queries)
+            search_queries = self.query_scheduler.plan(search_queries)
+            if progress_callback and len(search_queries) < total_queries:
+                progress_callback(f"Skipping {total_queries - len(search_queries)} exhausted queries.")
+        messages = {}
+        cached_queries = set()
 
+        def search(query):
+            query_messages = messages.setdefault(query, [])
+            # Failures must reach fan_out as errors, or they would be recorded as a query that yields nothing
+            # The socket gives up with fan_out, so a timed-out query does not keep holding a pool worker
+            return self.search_youtube(query, results_length, query_messages.append, raise_errors=True,
+                                       cached_queries=cached_queries, timeout=query_timeout)
+
+        def on_complete(done, total):
+            if progress_updater:
+                progress_updater(done / total * 100)
+
+        if progress_callback:
+            progress_callback(f"Searching {len(search_queries)} queries ({concurrency} at a time)...")
         total_new_results = 0
-        for idx, query in enumerate(search_queries, 1):
+        for idx, query, all_search_results, error in fan_out(search, search_queries, concurrency, query_timeout, on_complete):
             if progress_callback:
-                progress_callback(f"Searching for '{query}' ({idx}/{len(search_queries)})...")
-            all_search_results = self.search_youtube(query, results_length, progress_callback)
+                progress_callback(f"Searched '{query}' ({idx + 1}/{len(search_queries)})")
+                for message in messages.pop(query, []):
+                    progress_callback(message)
+                if isinstance(error, TimeoutError):
+                    progress_callback(f"Search for '{query}' {error}.")
+            if error is not None:
+                continue
+            # Cached results were already deduped on their real run, so they say nothing about the query's yield
+            recorded = query not in cached_queries
             if not all_search_results:
+                if recorded:
+                    self.query_scheduler.record(query, 0)
                 if progress_callback:
                     progress_callback(f"No search results found for '{query}'.")
                 continue
 
-            new_results = []
-            for video in all_search_results:
-                title = video['title']
-                url = video['url']
-                if (url in downloaded_urls or
-                    url in search_result_urls or
-                    is_title_similar(title, downloaded_titles) or
-                    is_title_similar(title, search_result_titles)):
-                    if progress_callback:
-                        progress_callback(f"Excluding (already exists or similar): {title}")
-                    continue
-                new_results.append(video)
+            # Exact repeats of a catalogued title are found through its index and skip the TF-IDF scoring
+            same_title = [video for video in all_search_results
+                          if video['url'] not in seen_urls and self.store.find_by_title(video['title'])]
+            same_title_urls = {video['url'] for video in same_title}
+            new_results, excluded = deduplicate_page(
+                [video for video in all_search_results if video['url'] not in same_title_urls],
+                seen_urls, self.downloaded_index, self.search_index)
+            excluded = [(video, "same title") for video in same_title] + excluded
+            if progress_callback:
+                for video, reason in excluded:
+                    progress_callback(f"Excluding ({reason}): {video['title']}")
 
             if new_results:
-                search_results.extend(new_results)
-                search_result_urls.extend([video['url'] for video in new_results])
-                search_result_titles.extend([video['title'] for video in new_results])
+                self.store.add_search_results(new_results)
+                seen_urls.update(video['url'] for video in new_results)
+                for video in new_results:
+                    self.search_index.add(video['url'], video['title'])
                 total_new_results += len(new_results)
                 if progress_callback:
                     progress_callback(f"Added {len(new_results)} unique videos for '{query}'.")
+            if recorded:
+                self.query_scheduler.record(query, len(new_results))
 
-            if progress_updater:
-                progress_updater(idx / len(search_queries) * 100)
+            if target_new and total_new_results >= target_new:
+                if progress_callback:
+                    progress_callback(f"Reached target of {target_new} new videos, stopping sweep.")
+                break
 
+        self.search_cache.log_stats()
         if total_new_results > 0:
-            save_list(self.search_results_file, search_results)
             if progress_callback:
                 progress_callback(f"Total: Added {total_new_results} unique videos to search results.")
             return True
@@ -147,55 +297,36 @@ class Downloader:
                 progress_callback("No new unique videos found in search results.")
             return False
 
-    def download_next_video(self, progress_callback=None, max_downloads=1, progress_updater=None):
-        search_results = load_list(self.search_results_file)
-        downloaded_list = load_list(self.downloaded_file)
-        downloaded_urls = [video['url'] for video in downloaded_list]
-        downloaded_titles = [video['title'] for video in downloaded_list]
+    def download_next_video(self, progress_callback=None, max_downloads=1, progress_updater=None,
+                            workers=DOWNLOAD_WORKERS, bandwidth_cap=BANDWIDTH_CAP, on_downloaded=None, video_filter=None,
+                            clip_duration=None, max_parts=None):
+        """Download up to ``max_downloads`` catalogue videos that pass ``video_filter``.
 
+        ``video_filter`` is a ``VideoFilter`` or a config dict overriding
+        ``DOWNLOAD_FILTER``. In clip mode the default duration cap is
+        lifted unless the config sets ``max_duration`` itself.
+        """
+        search_results = self.store.search_results()
         if not search_results:
             if progress_callback:
                 progress_callback("Search results list is empty. Please populate it first.")
             return False, []
 
-        os.makedirs("videos", exist_ok=True)
-        downloaded_count = 0
-        i = 0
-        video_paths = []
-        while i < len(search_results) and downloaded_count < max_downloads:
-            video = search_results[i]
-            original_title = video['title']
-            url = video['url']
-
-            if url in downloaded_urls:
-                if progress_callback:
-                    progress_callback(f"Skipping (already downloaded): {original_title}")
-                i += 1
-                continue
+        if not isinstance(video_filter, VideoFilter):
+            config = dict(video_filter or {})
+            if clip_duration:
+                # Only max_parts clips are fetched, so a long source costs no more than a short one
+                config.setdefault('max_duration', None)
+            video_filter = VideoFilter.from_config(config)
+        search_results, rejected = video_filter.apply(search_results)
+        if progress_callback:
+            for video, reason in rejected:
+                progress_callback(f"Skipping ({reason}): {video['title']}")
 
-            if is_title_similar(original_title, downloaded_titles):
-                if progress_callback:
-                    progress_callback(f"Skipping (similar title): {original_title}")
-                i += 1
-                continue
-
-            cleaned_title = clean_title(original_title)
-            success, message, video_path = self.download_video(url, cleaned_title, progress_callback)
-            if progress_callback:
-                progress_callback(message)
-            if success:
-                downloaded_list.append({"title": cleaned_title, "url": url, "path": video_path})
-                video_paths.append((video_path, cleaned_title))
-                search_results.pop(i)
-                downloaded_count += 1
-                if progress_callback:
-                    progress_callback("Download complete. One video processed.")
-                if progress_updater:
-                    progress_updater((downloaded_count / max_downloads) * 100)
-            else:
-                i += 1
-
-        save_list(self.search_results_file, search_results)
-        save_list(self.downloaded_file, downloaded_list)
-
-        return downloaded_count > 0, video_paths
\ No newline at end of file
+        os.makedirs("videos", exist_ok=True)
+        clip = {'max_duration': clip_duration, 'max_parts': max_parts} if clip_duration else None
+        scheduler = DownloadScheduler(self, workers=workers, bandwidth_cap=bandwidth_cap, clip=clip)
+        video_paths = scheduler.run(search_results, max_downloads, progress_callback, progress_updater, on_downloaded)
+        if progress_callback and video_paths:
+            progress_callback(f"Download complete. {len(video_paths)} video(s) processed.")
+        return len(video_paths) > 0, video_paths
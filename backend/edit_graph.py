@@ -0,0 +1,124 @@
+import os
+import ffmpeg
+from .color_grading import apply_grading
+from .overlay_assets import overlay_assets
+from .media_cache import media_cache
+
+# An edit recipe is a plain dict so it can be saved as JSON:
+#   {
+#     "crop": [x1, y1, x2, y2], "preserve_aspect": true,
+#     "text": {"text": "...", "x": 10, "y": 10, "font_size": 24, "color": "white", "font": "Arial"},
+#     "image": {"path": "logo.png", "x": 0, "y": 0, "width": 200, "scale": 1.0},
+#     "color": {"brightness": 1.0, "contrast": 1.0, "saturation": 1.0, "mode": "auto"},
+#     "audio_path": "music.mp3"
+#   }
+# Every key is optional.
+
+def recipe_from_params(crop_params=None, text_params=None, image_params=None, color_params=None, audio_path=None):
+    """Build a recipe from the positional tuples taken by ``Editor.edit_video_all``."""
+    recipe = {}
+    if crop_params:
+        recipe['crop'] = list(crop_params)
+        recipe['preserve_aspect'] = True
+    if text_params:
+        text, pos_x, pos_y, font, fontsize, color = text_params
+        recipe['text'] = {'text': text, 'x': pos_x, 'y': pos_y, 'font': font, 'font_size': fontsize, 'color': color}
+    if image_params:
+        image_path, pos_x, pos_y, width = image_params
+        recipe['image'] = {'path': image_path, 'x': pos_x, 'y': pos_y, 'width': width}
+    if color_params:
+        brightness, contrast, saturation = color_params
+        recipe['color'] = {'brightness': brightness, 'contrast': contrast, 'saturation': saturation}
+    if audio_path:
+        recipe['audio_path'] = audio_path
+    return recipe
+
+def resolve_crop(crop_params, video_width, video_height, preserve_aspect=False):
+    x1, y1, x2, y2 = crop_params
+    if preserve_aspect:
+        target_width = x2 - x1
+        target_height = y2 - y1
+        target_aspect = target_width / target_height
+        current_aspect = video_width / video_height
+        if current_aspect > target_aspect:
+            new_width = int(target_height * current_aspect)
+            x_center = (x1 + x2) / 2
+            x1 = max(0, int(x_center - new_width / 2))
+            x2 = min(video_width, int(x_center + new_width / 2))
+        else:
+            new_height = int(target_width / current_aspect)
+            y_center = (y1 + y2) / 2
+            y1 = max(0, int(y_center - new_height / 2))
+            y2 = min(video_height, int(y_center + new_height / 2))
+    return x1, y1, x2 - x1, y2 - y1
+
+def apply_text(video_stream, text_params):
+    text_png = overlay_assets.text(text_params['text'], text_params.get('font'),
+                                   text_params.get('font_size', 24), text_params.get('color', 'white'))
+    x = max(0, int(text_params.get('x', 10)))
+    y = max(0, int(text_params.get('y', 10)))
+    return ffmpeg.overlay(video_stream, ffmpeg.input(text_png), x=x, y=y)
+
+def apply_image(video_stream, image_params):
+    image_png = overlay_assets.image(image_params['path'], image_params.get('width'), image_params.get('scale', 1.0))
+    x = max(0, int(image_params.get('x', 0)))
+    y = max(0, int(image_params.get('y', 0)))
+    return ffmpeg.overlay(video_stream, ffmpeg.input(image_png), x=x, y=y)
+
+def apply_color(video_stream, color_params):
+    return apply_grading(video_stream, color_params, color_params.get('mode', 'auto'))
+
+def apply_video_recipe(video_stream, recipe, video_width, video_height):
+    """Chain the recipe's crop, text, image and color steps onto ``video_stream``."""
+    if recipe.get('crop'):
+        x, y, width, height = resolve_crop(recipe['crop'], video_width, video_height,
+                                           recipe.get('preserve_aspect', False))
+        video_stream = ffmpeg.crop(video_stream, x, y, width, height)
+    if recipe.get('text') and recipe['text'].get('text'):
+        video_stream = apply_text(video_stream, recipe['text'])
+    if recipe.get('image') and os.path.exists(recipe['image'].get('path', '')):
+        video_stream = apply_image(video_stream, recipe['image'])
+    if recipe.get('color'):
+        video_stream = apply_color(video_stream, recipe['color'])
+    return video_stream
+
+def compile_edit_graph(video_path, output_path, recipe, probe=None, threads=None, **output_args):
+    """Compile a whole edit recipe into one ffmpeg graph with a single encode.
+
+    Steps run in the order crop, text, image, color; audio from
+    ``audio_path`` replaces the original track, looped or trimmed to the
+    video's length. ``threads`` caps the decoder, filter graph and encoder
+    threads of the job. Returns the output node for ``ffmpeg.run``.
+    """
+    probe = probe or media_cache.probe(video_path)
+    video_info = next(stream for stream in probe['streams'] if stream['codec_type'] == 'video')
+    has_audio = any(stream['codec_type'] == 'audio' for stream in probe['streams'])
+    duration = float(probe['format'].get('duration', 0))
+
+    source = ffmpeg.input(video_path, **({'threads': threads} if threads else {}))
+    video_stream = apply_video_recipe(source.video, recipe, int(video_info['width']), int(video_info['height']))
+
+    output_args = {'vcodec': 'libx264', 'acodec': 'aac', 'pix_fmt': 'yuv420p', **output_args}
+    if threads:
+        output_args['threads'] = threads
+    if recipe.get('audio_path'):
+        audio_stream = ffmpeg.input(recipe['audio_path'], stream_loop=-1).audio
+        output = ffmpeg.output(video_stream, audio_stream, output_path, t=duration, **output_args)
+    elif has_audio:
+        output = ffmpeg.output(video_stream, source.audio, output_path, **output_args)
+    else:
+        output = ffmpeg.output(video_stream, output_path, **output_args)
+    if threads:
+        output = output.global_args('-filter_complex_threads', str(threads))
+    return output
+
+def compile_audio_mux(video_path, audio_path, output_path, **output_args):
+    """Replace the audio track without touching the video.
+
+    The video stream is copied as-is and only the new audio is encoded; it
+    is looped when shorter than the video and cut off when longer.
+    """
+    video = ffmpeg.input(video_path).video
+    audio = ffmpeg.input(audio_path, stream_loop=-1).audio
+    output_args = {'vcodec': 'copy', 'acodec': 'aac', 'shortest': None, **output_args}
+    return ffmpeg.output(video, audio, output_path, **output_args)
@@ -1,77 +1,92 @@
 import ffmpeg
 import logging
 import os
-from moviepy import VideoFileClip, TextClip, ImageClip, AudioFileClip, CompositeVideoClip
-from moviepy.video.fx import Crop, MultiplyColor, LumContrast
+from .keyframes import probe_keyframes
+from .segment_split import plan_cut_points, split_stream_copy, split_smart_cut
+from .color_grading import apply_grading
+from .frame_pipeline import Overlay, composite_overlays
+from .chunked_encode import chunked_encode
+from .render_cache import render_cache
+from .media_cache import media_cache
+from .child_processes import run_ffmpeg
+from .edit_graph import (compile_edit_graph, compile_audio_mux, recipe_from_params, resolve_crop,
+                         apply_image, apply_text)
 
 logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 class Editor:
-    def split_video(self, video_path, title, max_duration=60, progress_callback=None):
+    def split_video(self, video_path, title, max_duration=60, progress_callback=None, smart_cut=False):
         try:
-            video = VideoFileClip(video_path)
-            duration = video.duration
+            duration, keyframes = probe_keyframes(video_path)
             if duration <= max_duration:
-                video.close()
                 return [(video_path, title)]
 
-            splits = []
-            num_splits = int(duration // max_duration) + (1 if duration % max_duration > 0 else 0)
             from .utils import clean_title
             cleaned_title = clean_title(title)
 
-            for i in range(num_splits):
-                start_time = i * max_duration
-                end_time = min((i + 1) * max_duration, duration)
-                split_clip = video.subclip(start_time, end_time)
+            if smart_cut:
+                num_splits = int(duration // max_duration) + (1 if duration % max_duration > 0 else 0)
+                boundaries = [(i * max_duration, min((i + 1) * max_duration, duration)) for i in range(num_splits)]
+                split_paths = [f"videos/{cleaned_title} PART-{i + 1}.mp4" for i in range(num_splits)]
+                split_smart_cut(video_path, split_paths, keyframes, boundaries)
+            else:
+                cut_points = plan_cut_points(keyframes, duration, max_duration)
+                if not cut_points:
+                    return [(video_path, title)]
+                split_paths = split_stream_copy(video_path, f"videos/{cleaned_title} PART-%d.mp4", cut_points)
+
+            splits = []
+            for i, split_path in enumerate(split_paths):
                 split_title = f"{cleaned_title} PART-{i + 1}"
-                split_path = f"videos/{split_title}.mp4"
-                split_clip.write_videofile(split_path, codec="libx264", audio_codec="aac")
                 splits.append((split_path, split_title))
                 if progress_callback:
-                    progress_callback(f"Created split {i + 1}/{num_splits}: {split_title}")
+                    progress_callback(f"Created split {i + 1}/{len(split_paths)}: {split_title}")
 
-            video.close()
             os.remove(video_path)
             return splits
+        except ffmpeg.Error as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
+            if progress_callback:
+                progress_callback(f"Error splitting video {title}: {error_msg}")
+            logging.error(f"Error splitting video {title}: {error_msg}")
+            return [(video_path, title)]
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Error splitting video {title}: {str(e)}")
             logging.error(f"Error splitting video {title}: {str(e)}")
             return [(video_path, title)]
 
-    def edit_video_crop(self, video_path, output_path, crop_params, progress_callback=None, preserve_aspect=False):
-        try:
-            x1, y1, x2, y2 = crop_params
-            probe = ffmpeg.probe(video_path)
-            video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-            video_width = int(video_stream['width'])
-            video_height = int(video_stream['height'])
+    def _cached_render(self, video_path, output_path, operation, params, render_fn, progress_callback=None):
+        success, cached = render_cache.render(video_path, output_path, operation, params, render_fn)
+        if cached:
+            if progress_callback:
+                progress_callback(f"Unchanged edit, reusing cached render: {output_path}")
+            logging.info(f"Reused cached {operation} render for {video_path}: {output_path}")
+        return success
 
-            if preserve_aspect:
-                target_width = x2 - x1
-                target_height = y2 - y1
-                target_aspect = target_width / target_height
-                current_aspect = video_width / video_height
-                if current_aspect > target_aspect:
-                    new_width = int(target_height * current_aspect)
-                    x_center = (x1 + x2) / 2
-                    x1 = max(0, int(x_center - new_width / 2))
-                    x2 = min(video_width, int(x_center + new_width / 2))
-                else:
-                    new_height = int(target_width / current_aspect)
-                    y_center = (y1 + y2) / 2
-                    y1 = max(0, int(y_center - new_height / 2))
-                    y2 = min(video_height, int(y_center + new_height / 2))
+    def edit_video_crop(self, video_path, output_path, crop_params, progress_callback=None, preserve_aspect=False, chunks=None):
+        params = {'crop': list(crop_params), 'preserve_aspect': preserve_aspect}
+        return self._cached_render(video_path, output_path, "crop", params, lambda: self._edit_video_crop(
+            video_path, output_path, crop_params, progress_callback, preserve_aspect, chunks), progress_callback)
 
-            crop_width = x2 - x1
-            crop_height = y2 - y1
+    def _edit_video_crop(self, video_path, output_path, crop_params, progress_callback=None, preserve_aspect=False, chunks=None):
+        try:
+            if chunks:
+                chunked_encode(video_path, output_path, {'crop': list(crop_params), 'preserve_aspect': preserve_aspect},
+                               chunks, progress_callback=progress_callback)
+                if progress_callback:
+                    progress_callback(f"Cropped video saved to {output_path}")
+                return True
+
+            video_stream = media_cache.video_stream(video_path)
+            x1, y1, crop_width, crop_height = resolve_crop(
+                crop_params, int(video_stream['width']), int(video_stream['height']), preserve_aspect)
 
             stream = ffmpeg.input(video_path)
             stream = ffmpeg.crop(stream, x1, y1, crop_width, crop_height)
             stream = ffmpeg.output(stream, output_path, c='copy', vcodec='libx264', acodec='aac', strict='experimental')
-            ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+            run_ffmpeg(stream)
 
             if progress_callback:
                 progress_callback(f"Cropped video saved to {output_path}")
@@ -88,43 +103,37 @@ class Editor:
             logging.error(f"Error cropping video: {str(e)}")
             return False
 
-    def edit_video_overlays(self, video_path, output_path, overlay_params=None, text_params=None, progress_callback=None):
+    def edit_video_overlays(self, video_path, output_path, overlay_params=None, text_params=None, progress_callback=None, chunks=None):
+        params = {'overlay': overlay_params, 'text': text_params}
+        return self._cached_render(video_path, output_path, "overlays", params, lambda: self._edit_video_overlays(
+            video_path, output_path, overlay_params, text_params, progress_callback, chunks), progress_callback)
+
+    def _edit_video_overlays(self, video_path, output_path, overlay_params=None, text_params=None, progress_callback=None, chunks=None):
         try:
+            if chunks:
+                recipe = {}
+                if overlay_params and os.path.exists(overlay_params['image_path']):
+                    recipe['image'] = {'path': overlay_params['image_path'], **overlay_params}
+                if text_params and text_params.get('text'):
+                    recipe['text'] = text_params
+                chunked_encode(video_path, output_path, recipe, chunks, progress_callback=progress_callback)
+                if progress_callback:
+                    progress_callback(f"Overlays applied. Saved to {output_path}")
+                return True
+
             stream = ffmpeg.input(video_path)
             video_stream = stream['v']
-            audio_stream = stream['a'] if 'a' in stream else None
 
             if overlay_params and os.path.exists(overlay_params['image_path']):
-                image = ffmpeg.input(overlay_params['image_path'])
-                scale = max(0.1, float(overlay_params.get('scale', 1.0)))
-                image = ffmpeg.filter(image, 'scale', f"iw*{scale}", f"ih*{scale}")
-                x = max(0, int(overlay_params.get('x', 0)))
-                y = max(0, int(overlay_params.get('y', 0)))
-                video_stream = ffmpeg.overlay(video_stream, image, x=x, y=y)
+                video_stream = apply_image(video_stream, {'path': overlay_params['image_path'], **overlay_params})
 
             if text_params and text_params.get('text'):
-                text = text_params['text'].replace(":", "\\:").replace("'", "\\'")
-                font_size = max(1, int(text_params.get('font_size', 24)))
-                color = text_params.get('color', 'white')
-                x = max(0, int(text_params.get('x', 10)))
-                y = max(0, int(text_params.get('y', 10)))
-                video_stream = ffmpeg.drawtext(
-                    video_stream,
-                    text=text,
-                    fontfile='C:\\Windows\\Fonts\\arial.ttf',
-                    fontsize=font_size,
-                    fontcolor=color,
-                    x=x,
-                    y=y
-                )
+                video_stream = apply_text(video_stream, text_params)
 
             output_args = {'vcodec': 'libx264', 'acodec': 'aac', 'strict': 'experimental'}
-            if audio_stream:
-                stream = ffmpeg.output(video_stream, audio_stream, output_path, **output_args)
-            else:
-                stream = ffmpeg.output(video_stream, output_path, **output_args)
+            stream = ffmpeg.output(video_stream, stream['a?'], output_path, **output_args)
 
-            ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+            run_ffmpeg(stream)
 
             if progress_callback:
                 progress_callback(f"Overlays applied. Saved to {output_path}")
@@ -145,13 +154,8 @@ class Editor:
     def edit_video_text_overlay(self, video_path, output_path, text_params, progress_callback=None):
         try:
             text, pos_x, pos_y, font, fontsize, color = text_params
-            video = VideoFileClip(video_path)
-            text_clip = TextClip(text, font=font, fontsize=fontsize, color=color)
-            text_clip = text_clip.set_position((pos_x, pos_y)).set_duration(video.duration)
-            final = CompositeVideoClip([video, text_clip])
-            final.write_videofile(output_path, codec="libx264", audio_codec="aac", verbose=False)
-            final.close()
-            video.close()
+            overlay = Overlay.from_text(text, pos_x, pos_y, font, fontsize, color)
+            composite_overlays(video_path, output_path, [overlay])
             if progress_callback:
                 progress_callback(f"Text overlay added to {output_path}")
             return True
@@ -164,15 +168,8 @@ class Editor:
     def edit_video_image_overlay(self, video_path, output_path, image_params, progress_callback=None):
         try:
             image_path, pos_x, pos_y, width = image_params
-            video = VideoFileClip(video_path)
-            image_clip = ImageClip(image_path).set_duration(video.duration)
-            if width:
-                image_clip = image_clip.resize(width=width)
-            image_clip = image_clip.set_position((pos_x, pos_y))
-            final = CompositeVideoClip([video, image_clip])
-            final.write_videofile(output_path, codec="libx264", audio_codec="aac", verbose=False)
-            final.close()
-            video.close()
+            overlay = Overlay.from_image(image_path, pos_x, pos_y, width)
+            composite_overlays(video_path, output_path, [overlay])
             if progress_callback:
                 progress_callback(f"Image overlay added to {output_path}")
             return True
@@ -182,80 +179,81 @@ class Editor:
             logging.error(f"Error adding image overlay: {str(e)}")
             return False
 
-    def edit_video_color_grading(video_path, output_path, color_params, progress_callback=None):
+    def edit_video_color_grading(self, video_path, output_path, color_params, progress_callback=None, mode="auto"):
         try:
-            brightness, contrast_val, saturation = color_params
-            video = VideoFileClip(video_path)
-            adjusted = MultiplyColor.multiply_color(video, factor=brightness)
-            adjusted = LumContrast.lum_contrast(adjusted, contrast=contrast_val)
-            adjusted = MultiplyColor.multiply_color(adjusted, factor=saturation)
-            adjusted.write_videofile(output_path, codec="libx264", audio_codec="aac", verbose=False)
-            adjusted.close()
-            video.close()
+            source = ffmpeg.input(video_path)
+            video_stream = apply_grading(source.video, color_params, mode)
+            # '0:a?' keeps the original audio untouched and tolerates clips without any
+            stream = ffmpeg.output(video_stream, output_path, map='0:a?', vcodec='libx264', acodec='copy',
+                                   pix_fmt='yuv420p')
+            run_ffmpeg(stream)
             if progress_callback:
                 progress_callback(f"Color grading applied to {output_path}")
             return True
+        except ffmpeg.Error as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
+            if progress_callback:
+                progress_callback(f"Error applying color grading: {error_msg}")
+            logging.error(f"Error applying color grading: {error_msg}")
+            return False
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Error applying color grading: {str(e)}")
+            logging.error(f"Error applying color grading: {str(e)}")
             return False
 
     def edit_video_add_sound(self, video_path, output_path, audio_path, progress_callback=None):
         try:
-            video = VideoFileClip(video_path)
-            audio = AudioFileClip(audio_path).subclip(0, video.duration)
-            final = video.set_audio(audio)
-            final.write_videofile(output_path, codec="libx264", audio_codec="aac", verbose=False)
-            final.close()
-            video.close()
-            audio.close()
+            stream = compile_audio_mux(video_path, audio_path, output_path)
+            run_ffmpeg(stream)
             if progress_callback:
                 progress_callback(f"Audio added to {output_path}")
             return True
+        except ffmpeg.Error as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
+            if progress_callback:
+                progress_callback(f"Error adding audio: {error_msg}")
+            logging.error(f"Error adding audio: {error_msg}")
+            return False
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Error adding audio: {str(e)}")
             logging.error(f"Error adding audio: {str(e)}")
             return False
 
-    def edit_video_all(self, video_path, title, crop_params, text_params, image_params, color_params, audio_path, progress_callback=None):
+    def edit_video_recipe(self, video_path, output_path, recipe, progress_callback=None, chunks=None):
+        """Render an edit recipe (see ``edit_graph``) in one encode; returns True on success."""
         try:
-            os.makedirs(f"Edited/{title}", exist_ok=True)
-            current_path = video_path
-            temp_path = f"Edited/{title}/temp.mp4"
-            final_path = f"Edited/{title}/{title}.mp4"
-
-            if crop_params and self.edit_video_crop(current_path, temp_path, crop_params, progress_callback, preserve_aspect=True):
-                if current_path != video_path:
-                    os.remove(current_path)
-                current_path = temp_path
-
-            if text_params and self.edit_video_text_overlay(current_path, temp_path, text_params, progress_callback):
-                if current_path != temp_path:
-                    os.remove(current_path)
-                current_path = temp_path
-
-            if image_params and self.edit_video_image_overlay(current_path, temp_path, image_params, progress_callback):
-                if current_path != temp_path:
-                    os.remove(current_path)
-                current_path = temp_path
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
-            if color_params and self.edit_video_color_grading(current_path, temp_path, color_params, progress_callback):
-                if current_path != temp_path:
-                    os.remove(current_path)
-                current_path = temp_path
+            def render():
+                if chunks:
+                    chunked_encode(video_path, output_path, recipe, chunks, progress_callback=progress_callback)
+                else:
+                    stream = compile_edit_graph(video_path, output_path, recipe)
+                    run_ffmpeg(stream)
+                return True
 
-            if audio_path and self.edit_video_add_sound(current_path, final_path, audio_path, progress_callback):
-                if current_path != final_path:
-                    os.remove(current_path)
-            else:
-                os.rename(current_path, final_path)
+            success = self._cached_render(video_path, output_path, "all", recipe, render, progress_callback)
 
+            if success and progress_callback:
+                progress_callback(f"All edits applied, saved to {output_path}")
+            return success
+        except ffmpeg.Error as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
             if progress_callback:
-                progress_callback(f"All edits applied, saved to {final_path}")
-            return True, final_path
+                progress_callback(f"Error applying all edits: {error_msg}")
+            logging.error(f"Error applying all edits: {error_msg}")
+            return False
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Error applying all edits: {str(e)}")
             logging.error(f"Error applying all edits: {str(e)}")
-            return False, None
\ No newline at end of file
+            return False
+
+    def edit_video_all(self, video_path, title, crop_params, text_params, image_params, color_params, audio_path, progress_callback=None, chunks=None):
+        final_path = f"Edited/{title}/{title}.mp4"
+        recipe = recipe_from_params(crop_params, text_params, image_params, color_params, audio_path)
+        if self.edit_video_recipe(video_path, final_path, recipe, progress_callback, chunks):
+            return True, final_path
+        return False, None
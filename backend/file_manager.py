@@ -1,9 +1,8 @@
 import json
 import os
 import shutil
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import logging
+from .title_index import TitleIndex
 
 logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,12 +18,7 @@ def save_list(filename, data):
         json.dump(data, f, indent=4)
 
 def is_title_similar(new_title, existing_titles, threshold=0.8):
-    if not existing_titles:
-        return False
-    all_titles = existing_titles + [new_title]
-    vectorizer = TfidfVectorizer().fit_transform(all_titles)
-    similarity = cosine_similarity(vectorizer[-1], vectorizer[:-1])
-    return any(sim >= threshold for sim in similarity[0])
+    return TitleIndex(enumerate(existing_titles)).is_similar(new_title, threshold)
 
 def rename_video(video_path, new_title, output_dir, progress_callback=None):
     try:
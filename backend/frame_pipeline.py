@@ -0,0 +1,193 @@
+import tempfile
+import subprocess
+import logging
+import numpy as np
+import ffmpeg
+from .overlay_assets import overlay_assets
+from .media_cache import media_cache
+from .child_processes import spawn
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+PIXEL_FORMAT = 'rgb24'
+CHANNELS = 3
+QUIET_ARGS = ('-hide_banner', '-loglevel', 'error')
+
+class FramePipelineError(Exception):
+    pass
+
+class Overlay:
+    """An RGBA image placed at ``(x, y)``, premultiplied once up front.
+
+    Only the part that lands inside the frame is kept, so compositing is a
+    handful of in-place integer operations on a view of that rectangle.
+    """
+
+    def __init__(self, rgba, x=0, y=0):
+        self.rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+        self.x = int(x)
+        self.y = int(y)
+        self._region = None
+
+    @classmethod
+    def from_png(cls, png_path, x=0, y=0):
+        from PIL import Image
+        with Image.open(png_path) as image:
+            return cls(np.asarray(image.convert('RGBA')), x, y)
+
+    @classmethod
+    def from_image(cls, image_path, x=0, y=0, width=None, scale=1.0):
+        return cls.from_png(overlay_assets.image(image_path, width, scale), x, y)
+
+    @classmethod
+    def from_text(cls, text, x=10, y=10, font=None, font_size=24, color='white'):
+        return cls.from_png(overlay_assets.text(text, font, font_size, color), x, y)
+
+    def prepare(self, width, height):
+        """Clip to a ``width`` x ``height`` frame and premultiply; returns False if nothing is visible."""
+        x0, y0 = max(0, self.x), max(0, self.y)
+        x1 = min(width, self.x + self.rgba.shape[1])
+        y1 = min(height, self.y + self.rgba.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            self._region = None
+            return False
+        rgba = self.rgba[y0 - self.y:y1 - self.y, x0 - self.x:x1 - self.x].astype(np.uint16)
+        alpha = rgba[..., 3:4]
+        # frame * (255 - a) + color * a never exceeds 255 * 255, so uint16 is enough
+        self._premultiplied = rgba[..., :3] * alpha
+        self._inverse_alpha = np.broadcast_to(255 - alpha, self._premultiplied.shape).copy()
+        self._scratch = np.empty_like(self._premultiplied)
+        self._region = (slice(y0, y1), slice(x0, x1))
+        return True
+
+    def composite(self, frame):
+        if self._region is None:
+            return
+        target = frame[self._region]
+        np.multiply(target, self._inverse_alpha, out=self._scratch)
+        self._scratch += self._premultiplied
+        self._scratch += 127
+        self._scratch //= 255
+        target[...] = self._scratch
+
+class FramePipeline:
+    """Decode a video to raw RGB frames and encode processed frames back.
+
+    Frames are read into one preallocated buffer and exposed as a NumPy view
+    over it, and each frame is written to the encoder before the next one is
+    read, so memory stays at a single frame however long the video is. The
+    original audio is copied straight from the source file. Both ffmpeg
+    processes and their log files are torn down on exit, also on errors.
+    """
+
+    def __init__(self, video_path, output_path, probe=None, vcodec='libx264', **output_args):
+        self.video_path = video_path
+        self.output_path = output_path
+        probe = probe or media_cache.probe(video_path)
+        video_info = next(stream for stream in probe['streams'] if stream['codec_type'] == 'video')
+        self.width = int(video_info['width'])
+        self.height = int(video_info['height'])
+        self.frame_rate = video_info.get('r_frame_rate') or video_info.get('avg_frame_rate') or '25'
+        self.output_args = {'vcodec': vcodec, 'acodec': 'copy', 'pix_fmt': 'yuv420p', **output_args}
+        self.frame_size = self.width * self.height * CHANNELS
+        self._buffer = bytearray(self.frame_size)
+        self.frame = np.frombuffer(self._buffer, dtype=np.uint8).reshape(self.height, self.width, CHANNELS)
+        self.frames_written = 0
+        self._decoder = None
+        self._encoder = None
+        self._logs = []
+
+    def _spawn(self, args, **kwargs):
+        log = tempfile.TemporaryFile()
+        self._logs.append(log)
+        return spawn(args, stderr=log, **kwargs)
+
+    def __enter__(self):
+        try:
+            decode_args = (ffmpeg.input(self.video_path)
+                           .output('pipe:', format='rawvideo', pix_fmt=PIXEL_FORMAT)
+                           .global_args(*QUIET_ARGS).compile())
+            self._decoder = self._spawn(decode_args, stdout=subprocess.PIPE)
+            raw = ffmpeg.input('pipe:', format='rawvideo', pix_fmt=PIXEL_FORMAT,
+                               s=f"{self.width}x{self.height}", framerate=self.frame_rate)
+            encode_args = ffmpeg.output(raw, ffmpeg.input(self.video_path)['a?'], self.output_path,
+                                        **self.output_args).global_args(*QUIET_ARGS).overwrite_output().compile()
+            self._encoder = self._spawn(encode_args, stdin=subprocess.PIPE)
+        except Exception:
+            self._close(kill=True)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        failed = self._close(kill=exc_type is not None)
+        if exc_type is None and failed:
+            raise FramePipelineError(failed)
+        return False
+
+    def _read_frame(self):
+        view = memoryview(self._buffer)
+        filled = 0
+        while filled < self.frame_size:
+            count = self._decoder.stdout.readinto(view[filled:])
+            if not count:
+                if filled:
+                    raise FramePipelineError(f"Truncated frame from decoder ({filled} of {self.frame_size} bytes)")
+                return False
+            filled += count
+        return True
+
+    def frames(self):
+        """Yield the shared frame array once per decoded frame; edit it in place, then call ``write``."""
+        while self._read_frame():
+            yield self.frame
+
+    def write(self, frame=None):
+        try:
+            self._encoder.stdin.write(self._buffer if frame is None or frame is self.frame else frame.tobytes())
+        except BrokenPipeError:
+            raise FramePipelineError("Encoder exited early")
+        self.frames_written += 1
+
+    def _close(self, kill=False):
+        errors = []
+        for name, process, pipe in (("encoder", self._encoder, 'stdin'), ("decoder", self._decoder, 'stdout')):
+            if process is None:
+                continue
+            try:
+                if kill:
+                    process.kill()
+                stream = getattr(process, pipe)
+                if stream:
+                    try:
+                        stream.close()
+                    except BrokenPipeError:
+                        pass
+                if process.wait() != 0 and not kill:
+                    errors.append(f"{name} exited with {process.returncode}")
+            except Exception as e:
+                process.kill()
+                process.wait()
+                errors.append(f"{name}: {str(e)}")
+        if errors:
+            details = []
+            for log in self._logs:
+                log.seek(0)
+                details.append(log.read().decode(errors='replace').strip())
+            errors.extend(detail for detail in details if detail)
+        for log in self._logs:
+            log.close()
+        self._logs = []
+        self._decoder = self._encoder = None
+        return "\n".join(errors)
+
+def composite_overlays(video_path, output_path, overlays, probe=None, **output_args):
+    """Burn ``overlays`` into every frame of ``video_path``; returns the number of frames written."""
+    with FramePipeline(video_path, output_path, probe=probe, **output_args) as pipeline:
+        visible = [overlay for overlay in overlays if overlay.prepare(pipeline.width, pipeline.height)]
+        for frame in pipeline.frames():
+            for overlay in visible:
+                overlay.composite(frame)
+            pipeline.write()
+    logging.info(f"Composited {len(visible)} overlays onto {pipeline.frames_written} frames of {video_path}")
+    return pipeline.frames_written
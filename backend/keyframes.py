@@ -0,0 +1,9 @@
+from .media_cache import media_cache
+
+def probe_keyframes(video_path):
+    """Return ``(duration, keyframe_times)`` for the first video stream.
+
+    Results come from the shared media cache, keyed on path, size and
+    mtime, so a file is only scanned again after it changes.
+    """
+    return media_cache.keyframes(video_path)
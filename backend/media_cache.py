@@ -0,0 +1,164 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+MEDIA_CACHE_DIR = os.path.join(".cache", "media")
+MEDIA_CACHE_ENTRIES = 256
+PROBE_WORKERS = 4
+
+def _stamp(video_path):
+    stat = os.stat(video_path)
+    return os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns
+
+class MediaCache:
+    """ffprobe results kept in memory and on disk, keyed on path, size and mtime.
+
+    ``probe`` returns the same dict as ``ffmpeg.probe`` and ``keyframes``
+    the first video stream's keyframe times; the keyframe scan reads every
+    packet, so it only runs when asked for. Entries live in an LRU of
+    ``max_entries`` files backed by one JSON file per video, so a file is
+    probed again only after it changes. Returned dicts are shared and must
+    not be modified.
+    """
+
+    def __init__(self, cache_dir=MEDIA_CACHE_DIR, max_entries=MEDIA_CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_file(self, abspath):
+        return os.path.join(self.cache_dir, hashlib.sha1(abspath.encode()).hexdigest() + ".json")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        try:
+            with open(self._cache_file(key[0]), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('size') != key[1] or entry.get('mtime_ns') != key[2]:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _save(self, key, entry):
+        self._remember(key, entry)
+        cache_file = self._cache_file(key[0])
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, cache_file)
+        except OSError as e:
+            logging.warning(f"Could not write media cache for {key[0]}: {str(e)}")
+
+    def _entry(self, video_path, keyframes=False):
+        key = _stamp(video_path)
+        entry = self._load(key)
+        if entry is not None and (not keyframes or 'keyframes' in entry):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = dict(entry) if entry else {'path': key[0], 'size': key[1], 'mtime_ns': key[2]}
+        if 'probe' not in entry:
+            entry['probe'] = ffmpeg.probe(video_path)
+        if keyframes:
+            packets = ffmpeg.probe(video_path, select_streams='v:0', show_entries='packet=pts_time,flags')
+            entry['keyframes'] = sorted(float(packet['pts_time']) for packet in packets.get('packets', [])
+                                        if 'K' in packet.get('flags', '') and packet.get('pts_time') not in (None, 'N/A'))
+        self._save(key, entry)
+        return entry
+
+    def probe(self, video_path):
+        """Cached ``ffmpeg.probe(video_path)``; raises ``ffmpeg.Error`` like it."""
+        return self._entry(video_path)['probe']
+
+    def video_stream(self, video_path):
+        """The first video stream of ``video_path``, or None."""
+        return next((stream for stream in self.probe(video_path)['streams'] if stream['codec_type'] == 'video'), None)
+
+    def duration(self, video_path):
+        return float(self.probe(video_path)['format'].get('duration', 0))
+
+    def keyframes(self, video_path):
+        """Return ``(duration, keyframe_times)`` for the first video stream."""
+        entry = self._entry(video_path, keyframes=True)
+        return float(entry['probe']['format'].get('duration', 0)), entry['keyframes']
+
+    def codec_info(self, video_path):
+        """Codec names, frame size and rate of ``video_path`` at a glance."""
+        probe = self.probe(video_path)
+        video = self.video_stream(video_path) or {}
+        audio = next((stream for stream in probe['streams'] if stream['codec_type'] == 'audio'), {})
+        return {
+            'format': probe['format'].get('format_name'),
+            'duration': float(probe['format'].get('duration', 0)),
+            'bit_rate': int(probe['format'].get('bit_rate', 0) or 0),
+            'vcodec': video.get('codec_name'),
+            'width': video.get('width'),
+            'height': video.get('height'),
+            'frame_rate': video.get('avg_frame_rate') or video.get('r_frame_rate'),
+            'pix_fmt': video.get('pix_fmt'),
+            'acodec': audio.get('codec_name'),
+        }
+
+    def invalidate(self, video_path):
+        abspath = os.path.abspath(video_path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == abspath]:
+                del self._entries[key]
+        try:
+            os.remove(self._cache_file(abspath))
+        except OSError:
+            pass
+
+    def warm(self, video_paths, keyframes=False, workers=PROBE_WORKERS, progress_callback=None):
+        """Probe ``video_paths`` on ``workers`` threads so later lookups are hits.
+
+        Files that fail to probe are logged and skipped. Returns the number
+        of files now cached.
+        """
+        video_paths = list(video_paths)
+
+        def warm_one(video_path):
+            try:
+                self._entry(video_path, keyframes=keyframes)
+                return True
+            except (ffmpeg.Error, OSError) as e:
+                error_msg = e.stderr.decode() if getattr(e, 'stderr', None) else str(e)
+                logging.warning(f"Could not probe {video_path}: {error_msg}")
+                return False
+
+        if not video_paths:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(video_paths))), thread_name_prefix="probe") as executor:
+            cached = sum(executor.map(warm_one, video_paths))
+        logging.info(f"Media cache warmed: {cached}/{len(video_paths)} files")
+        if progress_callback:
+            progress_callback(f"Probed {cached}/{len(video_paths)} videos")
+        return cached
+
+media_cache = MediaCache()
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+import logging
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+OVERLAY_CACHE_DIR = ".cache/overlays"
+OVERLAY_CACHE_BYTES = 256 * 1024 * 1024
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+FALLBACK_FONTS = ("arial", "dejavusans", "liberationsans", "helvetica", "freesans")
+
+def font_dirs():
+    """Directories searched for fonts: the project's own ``fonts`` folder first, then the OS ones."""
+    dirs = ["fonts"]
+    if sys.platform.startswith("win"):
+        dirs.append(os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"))
+        dirs.append(os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        dirs += ["/System/Library/Fonts", "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    else:
+        dirs += ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.local/share/fonts"),
+                 os.path.expanduser("~/.fonts")]
+    return dirs
+
+def font_key(name):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return "".join(ch for ch in stem.lower() if ch.isalnum())
+
+class FontIndex:
+    """Maps font names such as ``"Arial"`` or ``"DejaVu Sans Bold"`` to font files on this machine."""
+
+    def __init__(self, dirs=None):
+        self.dirs = dirs
+        self._fonts = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        fonts = {}
+        for font_dir in self.dirs or font_dirs():
+            for root, _, files in os.walk(font_dir):
+                for name in sorted(files):
+                    if name.lower().endswith(FONT_EXTENSIONS):
+                        fonts.setdefault(font_key(name), os.path.join(root, name))
+        logging.info(f"Indexed {len(fonts)} fonts")
+        return fonts
+
+    @property
+    def fonts(self):
+        with self._lock:
+            if self._fonts is None:
+                self._fonts = self._scan()
+            return self._fonts
+
+    def resolve(self, font=None):
+        """Path of the best match for ``font``, falling back to a common sans face, or None."""
+        if font and os.path.isfile(font):
+            return font
+        fonts = self.fonts
+        if font:
+            key = font_key(font)
+            if key in fonts:
+                return fonts[key]
+            for regular in (key + "regular", key + "r"):
+                if regular in fonts:
+                    return fonts[regular]
+        for fallback in FALLBACK_FONTS:
+            if fallback in fonts:
+                return fonts[fallback]
+        return next(iter(fonts.values()), None)
+
+def pil_color(color):
+    """Accept ffmpeg style colors (``0xRRGGBB``, ``white@0.5``) as well as PIL ones."""
+    from PIL import ImageColor
+    color = str(color or 'white')
+    alpha = None
+    if '@' in color:
+        color, alpha = color.split('@', 1)
+    if color.lower().startswith('0x'):
+        color = '#' + color[2:]
+    rgba = ImageColor.getcolor(color, 'RGBA')
+    if alpha is not None:
+        rgba = rgba[:3] + (int(max(0.0, min(1.0, float(alpha))) * 255),)
+    return rgba
+
+class OverlayAssetCache:
+    """Rasterized overlays stored as RGBA PNGs, keyed by everything that affects their pixels.
+
+    A caption or logo is rendered once and then reused by every render that
+    asks for the same content, font, size, color and scale. Hits refresh the
+    file's mtime and the least recently used files are deleted once the
+    folder grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=OVERLAY_CACHE_DIR, max_bytes=OVERLAY_CACHE_BYTES, font_index=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.font_index = font_index or FontIndex()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, kind, key):
+        digest = hashlib.sha1(json.dumps([kind, *key], sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{kind}_{digest}.png")
+
+    def _lookup(self, path):
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def _store(self, path, image):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format='PNG')
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".png")]
+            except FileNotFoundError:
+                return
+            entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logging.info(f"Evicted overlay asset {path}")
+                except OSError:
+                    pass
+
+    def text(self, text, font=None, font_size=24, color='white'):
+        """PNG of ``text`` with the glyph origin at its top-left corner, as drawtext places it."""
+        font_path = self.font_index.resolve(font)
+        font_size = max(1, int(font_size))
+        path = self._path("text", (text, font_path, font_size, str(color)))
+        if self._lookup(path):
+            return path
+        from PIL import Image, ImageDraw, ImageFont
+        if font_path:
+            pil_font = ImageFont.truetype(font_path, font_size)
+        else:
+            pil_font = ImageFont.load_default(font_size)
+        _, _, right, bottom = pil_font.getbbox(text)
+        image = Image.new('RGBA', (max(1, right), max(1, bottom)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((0, 0), text, font=pil_font, fill=pil_color(color))
+        self._store(path, image)
+        logging.info(f"Rendered text overlay '{text}' with {font_path} at {font_size}px")
+        return path
+
+    def image(self, image_path, width=None, scale=1.0):
+        """RGBA PNG of ``image_path`` resized to ``width`` (keeping aspect) or by ``scale``."""
+        stat = os.stat(image_path)
+        width = int(width) if width else None
+        scale = 1.0 if width else max(0.1, float(scale or 1.0))
+        path = self._path("image", (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, width, scale))
+        if self._lookup(path):
+            return path
+        from PIL import Image
+        with Image.open(image_path) as source:
+            image = source.convert('RGBA')
+        if width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        elif scale != 1.0:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+        self._store(path, image)
+        logging.info(f"Rendered image overlay {image_path} at {image.width}x{image.height}")
+        return path
+
+overlay_assets = OverlayAssetCache()
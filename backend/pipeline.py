@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import logging
+from .downloader import Downloader
+from .editor import Editor
+from .uploader import Uploader
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+STAGES = ("search", "download", "split", "edit", "upload")
+
+def load_recipe(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class JsonLinesEmitter:
+    """Writes one JSON object per line, safe to call from worker threads."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+_DONE = object()
+
+class Stage:
+    """A pool of workers pulling items from a bounded inbox.
+
+    ``fn(item)`` returns a list of items for the next stage, or ``None`` on
+    failure. Putting into a full downstream queue blocks, which is what
+    applies backpressure to the stages upstream.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=4, emit=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.inbox = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.emit = emit
+        self.downstream = None
+        self.outputs = []
+        self.ok = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.started = None
+        self.finished = None
+        self._alive = self.workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def put(self, item):
+        self.inbox.put(item)
+        depth = self.inbox.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def close(self):
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._threads = [threading.Thread(target=self._work, name=f"{self.name}-{n + 1}", daemon=True)
+                         for n in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            start = time.monotonic()
+            try:
+                results = self.fn(item)
+            except Exception as e:
+                logging.error(f"Pipeline {self.name} failed for {item}: {str(e)}")
+                self.emit("log", stage=self.name, message=f"Error: {str(e)}")
+                results = None
+            seconds = time.monotonic() - start
+            with self._lock:
+                self.busy_seconds += seconds
+                if results is None:
+                    self.failed += 1
+                else:
+                    self.ok += 1
+            self.emit("item", stage=self.name, item=item[1] if isinstance(item, tuple) else str(item),
+                      ok=results is not None, seconds=round(seconds, 3))
+            for result in results or []:
+                if self.downstream:
+                    self.downstream.put(result)
+                else:
+                    with self._lock:
+                        self.outputs.append(result)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            self.finished = time.monotonic()
+            self.emit("stage_done", stage=self.name, **self.metrics())
+            if self.downstream:
+                self.downstream.close()
+
+    def metrics(self):
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+        return {
+            'ok': self.ok,
+            'failed': self.failed,
+            'workers': self.workers,
+            'queue_depth': self.inbox.qsize(),
+            'max_queue_depth': self.max_depth,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'seconds': round(elapsed, 3),
+            'items_per_minute': round(self.ok / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+        }
+
+class Pipeline:
+    """Headless search → download → split → edit → upload run driven by a recipe.
+
+    Search runs first; the remaining stages then stream into each other
+    through bounded queues, so a finished download is split and encoded
+    while the next one is still in flight. Each recipe section enables its
+    stage, ``workers`` sets its concurrency and ``queue_size`` the depth of
+    its inbox. Progress, per-item results and per-stage throughput and queue
+    depth are reported through ``emit(event, **fields)``.
+    """
+
+    def __init__(self, recipe, emit=None, downloader=None, editor=None, uploader=None, metrics_interval=5.0):
+        self.recipe = recipe
+        self.emit = emit or JsonLinesEmitter()
+        self.downloader = downloader or Downloader()
+        self.editor = editor or Editor()
+        self.uploader = uploader or Uploader()
+        self.metrics_interval = metrics_interval
+        self.metrics = {}
+
+    def _config(self, stage):
+        return self.recipe.get(stage) or {}
+
+    def _log(self, stage):
+        return lambda message: self.emit("log", stage=stage, message=message)
+
+    def search(self):
+        config = self._config("search")
+        self.emit("stage_start", stage="search", items=len(config['queries']), workers=config.get('workers', 4))
+        start = time.monotonic()
+        before = len(self.downloader.store.search_results())
+        self.downloader.populate_search_results(
+            config['queries'], config.get('results_length', 10),
+            progress_callback=self._log("search"),
+            progress_updater=lambda percent: self.emit("progress", stage="search", percent=round(percent, 1)),
+            concurrency=config.get('workers', 4), schedule=config.get('schedule', True),
+            target_new=config.get('target_new'))
+        seconds = time.monotonic() - start
+        added = len(self.downloader.store.search_results()) - before
+        self.metrics["search"] = {'ok': added, 'seconds': round(seconds, 3),
+                                  'items_per_minute': round(added / seconds * 60, 2) if seconds else 0.0}
+        self.emit("stage_done", stage="search", **self.metrics["search"])
+
+    def download(self, first_stage):
+        config = self._config("download")
+        self.emit("stage_start", stage="download", items=config.get('max_downloads', 1), workers=config.get('workers', 3))
+        start = time.monotonic()
+        count = [0]
+
+        def on_downloaded(video_path, title):
+            count[0] += 1
+            if first_stage:
+                first_stage.put((video_path, title))
+
+        _, video_paths = self.downloader.download_next_video(
+            progress_callback=self._log("download"),
+            max_downloads=config.get('max_downloads', 1),
+            progress_updater=lambda percent: self.emit("progress", stage="download", percent=round(percent, 1)),
+            workers=config.get('workers', 3), bandwidth_cap=config.get('bandwidth_cap'),
+            clip_duration=config.get('clip_duration'), max_parts=config.get('max_parts'),
+            video_filter=config.get('filter'), on_downloaded=on_downloaded)
+        seconds = time.monotonic() - start
+        self.metrics["download"] = {'ok': count[0], 'seconds': round(seconds, 3),
+                                    'items_per_minute': round(count[0] / seconds * 60, 2) if seconds else 0.0}
+        self.emit("stage_done", stage="download", **self.metrics["download"])
+        return video_paths
+
+    def split(self, item):
+        video_path, title = item
+        config = self._config("split")
+        return self.editor.split_video(video_path, title, config.get('max_duration', 60),
+                                       progress_callback=self._log("split"), smart_cut=config.get('smart_cut', False))
+
+    def edit(self, item):
+        video_path, title = item
+        config = self._config("edit")
+        success, final_path = self.editor.edit_video_all(
+            video_path, title, config.get('crop_params'), config.get('text_params'), config.get('image_params'),
+            config.get('color_params'), config.get('audio_path'), progress_callback=self._log("edit"),
+            chunks=config.get('chunks'))
+        return [(final_path, title)] if success else None
+
+    def upload(self, item):
+        video_path, title = item
+        config = self._config("upload")
+        access_token = os.environ.get(config.get('access_token_env', 'FACEBOOK_ACCESS_TOKEN'), '')
+        if self.uploader.upload_to_facebook(video_path, config['page_id'], access_token, title,
+                                            progress_callback=self._log("upload")):
+            return [item]
+        return None
+
+    def _report_metrics(self, stages, stop):
+        while not stop.wait(self.metrics_interval):
+            self.emit("metrics", stages={stage.name: stage.metrics() for stage in stages})
+
+    def run(self):
+        start = time.monotonic()
+        self.emit("pipeline_start", stages=[stage for stage in STAGES if stage in self.recipe])
+        if "search" in self.recipe:
+            self.search()
+
+        stages = []
+        for name, fn in (("split", self.split), ("edit", self.edit), ("upload", self.upload)):
+            if name in self.recipe:
+                config = self._config(name)
+                stages.append(Stage(name, fn, config.get('workers', 1), config.get('queue_size', 4), self.emit))
+        for stage, downstream in zip(stages, stages[1:]):
+            stage.downstream = downstream
+        for stage in stages:
+            self.emit("stage_start", stage=stage.name, workers=stage.workers, queue_size=stage.inbox.maxsize)
+            stage.start()
+
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._report_metrics, args=(stages, stop), daemon=True)
+        reporter.start()
+        first_stage = stages[0] if stages else None
+        if "download" in self.recipe:
+            items = self.download(first_stage)
+        else:
+            items = [tuple(item) for item in self.recipe.get('inputs', [])]
+            for item in items:
+                if first_stage:
+                    first_stage.put(item)
+        if first_stage:
+            first_stage.close()
+            for stage in stages:
+                stage.join()
+            items = stages[-1].outputs
+        stop.set()
+
+        for stage in stages:
+            self.metrics[stage.name] = stage.metrics()
+        self.emit("pipeline_done", seconds=round(time.monotonic() - start, 3), outputs=[path for path, _ in items],
+                  metrics=self.metrics)
+        return items
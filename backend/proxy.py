@@ -0,0 +1,101 @@
+import os
+import hashlib
+import tempfile
+import threading
+import subprocess
+import logging
+import ffmpeg
+from .child_processes import spawn
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+PROXY_CACHE_DIR = os.path.join(".cache", "proxies")
+PROXY_CACHE_BYTES = 4 * 1024 * 1024 * 1024
+PROXY_HEIGHT = 360
+PROXY_CRF = 28
+POLL_SECONDS = 0.2
+
+def run_interruptible(stream, output_path, checkpoint=None, poll_seconds=POLL_SECONDS, **output_args):
+    """Encode ``stream`` into ``output_path`` via a per-thread temp file, calling ``checkpoint()`` meanwhile.
+
+    Anything ``checkpoint`` raises kills ffmpeg, removes the partial file
+    and propagates, so a caller can abandon an encode it no longer needs.
+    The finished file is moved into place atomically. Raises
+    ``ffmpeg.Error`` if ffmpeg fails.
+    """
+    root, ext = os.path.splitext(output_path)
+    tmp_path = f"{root}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+    args = (ffmpeg.output(stream, tmp_path, **output_args).global_args('-hide_banner', '-loglevel', 'error')
+            .overwrite_output().compile())
+    with tempfile.TemporaryFile() as log:
+        process = spawn(args, stdout=subprocess.DEVNULL, stderr=log)
+        try:
+            while True:
+                try:
+                    returncode = process.wait(timeout=poll_seconds)
+                    break
+                except subprocess.TimeoutExpired:
+                    if checkpoint:
+                        checkpoint()
+            if returncode != 0:
+                log.seek(0)
+                raise ffmpeg.Error('ffmpeg', b'', log.read())
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            process.kill()
+            process.wait()
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    return output_path
+
+def proxy_path(video_path, height=PROXY_HEIGHT, cache_dir=PROXY_CACHE_DIR):
+    """Where the proxy of ``video_path`` lives; changes whenever the source file does."""
+    stat = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}:{height}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".mp4")
+
+def evict_proxies(cache_dir=PROXY_CACHE_DIR, max_bytes=PROXY_CACHE_BYTES, keep=None):
+    """Delete the least recently used proxies until the folder fits in ``max_bytes``."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".mp4") and ".tmp" not in entry.name]
+    except FileNotFoundError:
+        return
+    entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            logging.info(f"Evicted proxy {path}")
+        except OSError:
+            pass
+
+def make_proxy(video_path, height=PROXY_HEIGHT, cache_dir=PROXY_CACHE_DIR, max_bytes=PROXY_CACHE_BYTES, checkpoint=None):
+    """Encode a small all-intra, video-only copy of ``video_path`` for previewing; returns its path.
+
+    Every frame is a keyframe, so the preview can seek to any frame by
+    decoding just that one. Sources shorter than ``height`` keep their
+    size. Proxies are cached per path, size and mtime, and the least
+    recently used ones are dropped once the folder grows past
+    ``max_bytes``. ``checkpoint`` is passed to ``run_interruptible``.
+    Raises ``ffmpeg.Error`` if the encode fails.
+    """
+    path = proxy_path(video_path, height, cache_dir)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    stream = ffmpeg.input(video_path).video.filter('scale', -2, f"min({height},ih)")
+    run_interruptible(stream, path, checkpoint, vcodec='libx264', preset='ultrafast', crf=PROXY_CRF, g=1,
+                      pix_fmt='yuv420p', an=None)
+    logging.info(f"Proxy for {video_path}: {path}")
+    evict_proxies(cache_dir, max_bytes, keep=path)
+    return path
@@ -0,0 +1,58 @@
+import time
+import logging
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+YIELD_DECAY = 0.5
+EXHAUSTED_BACKOFF = 24 * 60 * 60
+MAX_BACKOFF = 30 * 24 * 60 * 60
+
+class QueryScheduler:
+    """Orders search sweeps by how many new videos each query tends to add.
+
+    The expected yield of a query is an exponentially weighted average of the
+    unique results its past runs added. Queries that have never run come
+    first. A run that adds nothing puts the query on a backoff that doubles
+    with every further empty run, up to ``max_backoff`` seconds.
+    """
+
+    def __init__(self, store, decay=YIELD_DECAY, backoff=EXHAUSTED_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.store = store
+        self.decay = decay
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def plan(self, queries, now=None):
+        now = time.time() if now is None else now
+        stats = self.store.query_stats()
+        planned = []
+        skipped = 0
+        for position, query in enumerate(queries):
+            query_stats = stats.get(query)
+            if query_stats is None:
+                planned.append((0, -float('inf'), position, query))
+            elif query_stats['next_run'] <= now:
+                planned.append((1, -query_stats['expected_yield'], position, query))
+            else:
+                skipped += 1
+        if skipped:
+            logging.info(f"Query scheduler: skipping {skipped} exhausted queries still on backoff")
+        return [query for _, _, _, query in sorted(planned)]
+
+    def record(self, query, new_results, now=None):
+        now = time.time() if now is None else now
+        stats = self.store.query_stat(query) or {
+            'query': query, 'runs': 0, 'total_new': 0, 'expected_yield': float(new_results),
+            'empty_streak': 0, 'last_run': None, 'next_run': 0}
+        stats['expected_yield'] = self.decay * new_results + (1 - self.decay) * stats['expected_yield']
+        stats['runs'] += 1
+        stats['total_new'] += new_results
+        stats['last_run'] = now
+        if new_results:
+            stats['empty_streak'] = 0
+            stats['next_run'] = 0
+        else:
+            stats['empty_streak'] += 1
+            stats['next_run'] = now + min(self.max_backoff, self.backoff * 2 ** (stats['empty_streak'] - 1))
+        self.store.save_query_stats(stats)
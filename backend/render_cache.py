@@ -0,0 +1,172 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import hashlib
+import threading
+import logging
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+RENDER_CACHE_DIR = ".cache/renders"
+RENDER_CACHE_BYTES = 5 * 1024 * 1024 * 1024
+MANIFEST_FILE = "manifest.json"
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+# Bump when encoder settings change so old renders are not reused
+RENDER_VERSION = 1
+FILE_PARAMS = ("path", "image_path", "audio_path")
+
+def content_hash(path, chunk_size=HASH_CHUNK_SIZE):
+    """blake2b of the file's bytes, read through mmap in fixed-size chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, size, chunk_size):
+                    digest.update(mapped[offset:offset + chunk_size])
+    return digest.hexdigest()
+
+def _place(source, destination):
+    """Hard-link ``source`` to ``destination`` when possible, copy otherwise."""
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    tmp_path = f"{destination}.{threading.get_ident()}.tmp"
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+class RenderCache:
+    """Finished renders keyed by input content and normalized edit parameters.
+
+    A render is looked up before encoding; on a hit the cached file is
+    linked to the requested output path and nothing is encoded. Content
+    hashes are remembered per (path, size, mtime) so unchanged inputs are
+    not re-read. The manifest records each entry's size and last use, and
+    the least recently used renders are dropped once the cache grows past
+    ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+        self._lock = threading.RLock()
+        self._manifest = None
+
+    def _load(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {}
+            self._manifest.setdefault('entries', {})
+            self._manifest.setdefault('hashes', {})
+        return self._manifest
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        abspath = os.path.abspath(path)
+        with self._lock:
+            known = self._load()['hashes'].get(abspath)
+            if known and known['stamp'] == stamp:
+                return known['hash']
+        digest = content_hash(path)
+        with self._lock:
+            self._load()['hashes'][abspath] = {'stamp': stamp, 'hash': digest}
+        return digest
+
+    def _normalize(self, value, name=None):
+        if isinstance(value, dict):
+            return {key: self._normalize(item, key) for key, item in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(item) for item in value]
+        if isinstance(value, float):
+            return round(value, 6)
+        if name in FILE_PARAMS and isinstance(value, str) and os.path.isfile(value):
+            return {'content': self.file_hash(value)}
+        return value
+
+    def key(self, video_path, operation, params):
+        """Cache key for applying ``operation`` with ``params`` to ``video_path``'s content."""
+        payload = json.dumps({'version': RENDER_VERSION, 'input': self.file_hash(video_path),
+                              'operation': operation, 'params': self._normalize(params)}, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _entry_path(self, key, output_path):
+        return os.path.join(self.cache_dir, key + (os.path.splitext(output_path)[1] or ".mp4"))
+
+    def fetch(self, key, output_path):
+        """Place the cached render for ``key`` at ``output_path``; returns False on a miss."""
+        with self._lock:
+            entry = self._load()['entries'].get(key)
+            if not entry or not os.path.exists(entry['file']):
+                return False
+            if not os.path.exists(output_path) or not os.path.samefile(entry['file'], output_path):
+                _place(entry['file'], output_path)
+            entry['last_used'] = time.time()
+            self._save()
+        logging.info(f"Render cache hit for {output_path}")
+        return True
+
+    def store(self, key, output_path, operation=None):
+        """Keep a copy of the fresh render at ``output_path`` under ``key``."""
+        with self._lock:
+            entry_path = self._entry_path(key, output_path)
+            _place(output_path, entry_path)
+            self._load()['entries'][key] = {'file': entry_path, 'operation': operation,
+                                            'size': os.path.getsize(entry_path), 'last_used': time.time()}
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        entries = self._manifest['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry['file'])
+            except OSError:
+                pass
+            total -= entry['size']
+            del entries[key]
+            logging.info(f"Evicted cached render {entry['file']}")
+
+    def render(self, video_path, output_path, operation, params, render_fn):
+        """Run ``render_fn()`` unless an identical render is cached; returns ``(success, cached)``.
+
+        If the cache itself fails (unreadable input, full disk) the render
+        still runs, just uncached.
+        """
+        try:
+            key = self.key(video_path, operation, params)
+            if self.fetch(key, output_path):
+                return True, True
+            # ffmpeg truncates existing outputs in place, which would clobber a cache entry linked to it
+            if os.path.exists(output_path) and os.stat(output_path).st_nlink > 1:
+                os.remove(output_path)
+        except OSError as e:
+            logging.warning(f"Render cache unavailable for {video_path}: {str(e)}")
+            return render_fn(), False
+        success = render_fn()
+        if success and os.path.exists(output_path):
+            try:
+                self.store(key, output_path, operation)
+            except OSError as e:
+                logging.warning(f"Could not cache render {output_path}: {str(e)}")
+        return success, False
+
+render_cache = RenderCache()
@@ -0,0 +1,66 @@
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SEARCH_CACHE_DB = "search_cache.db"
+SEARCH_CACHE_TTL = 6 * 60 * 60
+SEARCH_CACHE_MAX_ENTRIES = 5000
+
+class SearchCache:
+    """Persistent cache of search results keyed by (query, results_length).
+
+    Entries older than ``ttl`` seconds are treated as misses; once the cache
+    holds more than ``max_entries`` the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path=SEARCH_CACHE_DB, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "query TEXT NOT NULL, results_length INTEGER NOT NULL, results TEXT NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL, "
+                "PRIMARY KEY (query, results_length))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache(last_access)")
+
+    def get(self, query, results_length):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT results, created FROM search_cache WHERE query = ? AND results_length = ?",
+                (query, results_length)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                logging.debug(f"Search cache miss for '{query}' ({results_length})")
+                return None
+            self._conn.execute("UPDATE search_cache SET last_access = ? WHERE query = ? AND results_length = ?",
+                               (now, query, results_length))
+            self.hits += 1
+        logging.debug(f"Search cache hit for '{query}' ({results_length})")
+        return json.loads(row[0])
+
+    def put(self, query, results_length, results):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query, results_length, results, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", (query, results_length, json.dumps(results), now, now))
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE rowid IN (SELECT rowid FROM search_cache "
+                "ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        logging.info(f"Search cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)")
@@ -0,0 +1,56 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+def fan_out(search_fn, queries, max_workers=4, timeout=None, on_complete=None):
+    """Run ``search_fn(query)`` for every query on a bounded thread pool.
+
+    Yields ``(idx, query, results, error)`` in query order, each one as soon
+    as it and every earlier query have finished, so callers can merge into
+    the catalogue while later queries are still in flight and still get the
+    same outcome as a sequential sweep. A query running longer than
+    ``timeout`` seconds is abandoned and yielded with a ``TimeoutError``.
+    ``on_complete(done, total)`` is called whenever any query finishes.
+    """
+    queries = list(queries)
+    started = {}
+
+    def run(idx, query):
+        started[idx] = time.monotonic()
+        return search_fn(query)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="search")
+    try:
+        futures = {executor.submit(run, idx, query): idx for idx, query in enumerate(queries)}
+        pending = set(futures)
+        finished = {}
+        next_idx = 0
+        while next_idx < len(queries):
+            if pending:
+                done, pending = wait(pending, timeout=0.5 if timeout else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures[future]
+                    try:
+                        finished[idx] = (future.result(), None)
+                    except Exception as e:
+                        logging.error(f"Search failed for '{queries[idx]}': {str(e)}")
+                        finished[idx] = ([], e)
+                if timeout:
+                    now = time.monotonic()
+                    for future in [f for f in pending if futures[f] in started and now - started[futures[f]] > timeout]:
+                        idx = futures[future]
+                        pending.discard(future)
+                        logging.warning(f"Search for '{queries[idx]}' timed out after {timeout} seconds")
+                        finished[idx] = ([], TimeoutError(f"timed out after {timeout} seconds"))
+                        done = done | {future}
+                if done and on_complete:
+                    on_complete(len(queries) - len(pending), len(queries))
+            while next_idx in finished:
+                results, error = finished.pop(next_idx)
+                yield next_idx, queries[next_idx], results, error
+                next_idx += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,114 @@
+import os
+import bisect
+import tempfile
+import ffmpeg
+from .media_cache import media_cache
+from .child_processes import run_ffmpeg
+
+DEFAULT_FRAME_DURATION = 1 / 25
+
+def plan_cut_points(keyframes, duration, max_duration):
+    """Pick keyframe cut points so that no part is longer than ``max_duration``.
+
+    Each cut is the last keyframe at or before the part's time budget; only
+    when a GOP is longer than ``max_duration`` does the cut move to the next
+    keyframe after it.
+    """
+    cuts = []
+    previous = 0.0
+    target = max_duration
+    while target < duration:
+        pos = bisect.bisect_right(keyframes, target + 1e-6)
+        if pos and keyframes[pos - 1] > previous + 1e-6:
+            cut = keyframes[pos - 1]
+        elif pos < len(keyframes):
+            cut = keyframes[pos]
+        else:
+            break
+        if cut >= duration:
+            break
+        cuts.append(cut)
+        previous = cut
+        target = cut + max_duration
+    return cuts
+
+def _frame_duration(video_path):
+    video_stream = media_cache.video_stream(video_path) or {}
+    numerator, _, denominator = (video_stream.get('avg_frame_rate') or '').partition('/')
+    try:
+        return float(denominator or 1) / float(numerator)
+    except (ValueError, ZeroDivisionError):
+        return DEFAULT_FRAME_DURATION
+
+def split_stream_copy(video_path, output_template, cut_points):
+    """Cut ``video_path`` at ``cut_points`` with the segment muxer, without re-encoding.
+
+    ``output_template`` is a printf-style path such as ``videos/title PART-%d.mp4``;
+    parts are numbered from 1.
+    """
+    # With B-frames the keyframe's packet is muxed before its presentation time is reached, so the
+    # segment muxer passes over a cut set exactly on the keyframe; asking half a frame early lands on it
+    lead = _frame_duration(video_path) / 2
+    stream = ffmpeg.input(video_path)
+    stream = ffmpeg.output(stream, output_template, c='copy', f='segment',
+                           segment_times=','.join(f"{max(cut - lead, 0.0):.6f}" for cut in cut_points),
+                           segment_start_number=1, reset_timestamps=1, avoid_negative_ts='make_zero')
+    run_ffmpeg(stream)
+    return [output_template % (i + 1) for i in range(len(cut_points) + 1)]
+
+def _encode_range(video_path, output_path, start, end):
+    stream = ffmpeg.input(video_path, ss=start, to=end)
+    stream = ffmpeg.output(stream, output_path, vcodec='libx264', acodec='aac', preset='veryfast', crf=18)
+    run_ffmpeg(stream)
+
+def _copy_range(video_path, output_path, start, end, frames=None):
+    # A stream copy stops on decode timestamps, which run behind with B-frames, so ``-to`` alone lets
+    # frames past ``end`` through; a video frame count stops exactly at the next keyframe instead
+    output_args = {'vframes': frames} if frames else {}
+    stream = ffmpeg.input(video_path, ss=start, to=end)
+    stream = ffmpeg.output(stream, output_path, c='copy', avoid_negative_ts='make_zero', **output_args)
+    run_ffmpeg(stream)
+
+def split_smart_cut(video_path, output_paths, keyframes, boundaries):
+    """Frame-accurate split that only re-encodes the partial GOPs at each part's boundaries.
+
+    ``boundaries`` is the list of ``(start, end)`` times for ``output_paths``.
+    Whole GOPs, from the first keyframe at or after ``start`` to the last
+    keyframe at or before ``end``, are stream-copied; the frames before and
+    after them are encoded with libx264, and the pieces are joined with the
+    concat demuxer. The source is expected to be H.264/AAC so all pieces
+    share codecs.
+    """
+    frame_duration = _frame_duration(video_path)
+    with tempfile.TemporaryDirectory(prefix="smartcut_") as temp_dir:
+        for i, ((start, end), output_path) in enumerate(zip(boundaries, output_paths)):
+            first = bisect.bisect_left(keyframes, start - 1e-3)
+            last = bisect.bisect_right(keyframes, end + 1e-3) - 1
+            if first >= len(keyframes) or last < 0 or keyframes[first] >= keyframes[last]:
+                _encode_range(video_path, output_path, start, end)
+                continue
+            copy_start, copy_end = keyframes[first], keyframes[last]
+            copy_frames = round((copy_end - copy_start) / frame_duration)
+            pieces = []
+            if copy_start - start > 1e-3:
+                pieces.append((start, copy_start))
+            pieces.append((copy_start, copy_end))
+            if end - copy_end > 1e-3:
+                pieces.append((copy_end, end))
+            if len(pieces) == 1:
+                _copy_range(video_path, output_path, copy_start, copy_end, copy_frames)
+                continue
+            piece_paths = []
+            for n, (piece_start, piece_end) in enumerate(pieces):
+                piece_path = os.path.join(temp_dir, f"part_{i}_{n}.mp4")
+                if piece_start == copy_start:
+                    _copy_range(video_path, piece_path, piece_start, piece_end, copy_frames)
+                else:
+                    _encode_range(video_path, piece_path, piece_start, piece_end)
+                piece_paths.append(piece_path)
+            concat_list = os.path.join(temp_dir, f"parts_{i}.txt")
+            with open(concat_list, 'w') as f:
+                f.write("".join(f"file '{os.path.abspath(piece_path)}'\n" for piece_path in piece_paths))
+            stream = ffmpeg.output(ffmpeg.input(concat_list, f='concat', safe=0), output_path, c='copy')
+            run_ffmpeg(stream)
+    return output_paths
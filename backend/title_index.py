@@ -0,0 +1,141 @@
+import math
+import re
+import threading
+from collections import Counter
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+def tokenize(title):
+    return TOKEN_PATTERN.findall(title.lower())
+
+class TitleIndex:
+    """Incremental near-duplicate index over video titles.
+
+    Answers the same question as ``file_manager.is_title_similar`` without
+    refitting a ``TfidfVectorizer`` per candidate. Document frequencies are
+    kept up to date as titles are added or removed, so the smoothed IDF
+    weights (``ln((1 + n) / (1 + df)) + 1`` with raw term counts and L2
+    normalisation) are exactly the ones a refit over ``existing + [new]``
+    would produce. Candidates are looked up through an inverted index using
+    prefix filtering: only titles sharing one of the query's heaviest tokens
+    can reach the threshold, so common words such as "fight" are rarely
+    scanned.
+
+    Decisions match the TF-IDF cosine check except when a cosine lies within
+    floating-point rounding (about 1e-9) of the threshold;
+    ``python -m backend.title_index_check`` compares the two on a corpus.
+    """
+
+    def __init__(self, titles=None):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._df = Counter()
+        self._postings = {}
+        for key, title in (titles or []):
+            self.add(key, title)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    def add(self, key, title):
+        with self._lock:
+            if key in self._docs:
+                self.remove(key)
+            counts = Counter(tokenize(title))
+            self._docs[key] = counts
+            for token in counts:
+                self._df[token] += 1
+                self._postings.setdefault(token, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            counts = self._docs.pop(key, None)
+            if counts is None:
+                return
+            for token in counts:
+                self._df[token] -= 1
+                if not self._df[token]:
+                    del self._df[token]
+                postings = self._postings[token]
+                postings.discard(key)
+                if not postings:
+                    del self._postings[token]
+
+    def _idf_function(self, n_docs, extra_df):
+        def idf(token):
+            return math.log((1 + n_docs) / (1 + self._df.get(token, 0) + extra_df.get(token, 0))) + 1
+        return idf
+
+    @staticmethod
+    def _weights(counts, idf):
+        weights = {token: count * idf(token) for token, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {token: w / norm for token, w in weights.items()} if norm else {}
+
+    def _candidates(self, query_weights, threshold):
+        # Prefix filter: a title that shares none of the prefix tokens can only
+        # overlap on the remaining mass, which is kept below the threshold.
+        remaining = sum(w * w for w in query_weights.values())
+        bound = threshold * threshold * (1 - 1e-9) if threshold > 0 else 0
+        candidates = set()
+        for token, weight in sorted(query_weights.items(), key=lambda item: -item[1]):
+            if remaining < bound:
+                break
+            candidates.update(self._postings.get(token, ()))
+            remaining -= weight * weight
+        return candidates
+
+    def is_similar(self, title, threshold=0.8):
+        with self._lock:
+            if not self._docs:
+                return False
+            if threshold <= 0:
+                return True
+            query_counts = Counter(tokenize(title))
+            idf = self._idf_function(len(self._docs) + 1, dict.fromkeys(query_counts, 1))
+            query_weights = self._weights(query_counts, idf)
+            for key in self._candidates(query_weights, threshold):
+                doc_weights = self._weights(self._docs[key], idf)
+                if sum(w * doc_weights.get(token, 0.0) for token, w in query_weights.items()) >= threshold:
+                    return True
+            return False
+
+    def similarity_matrices(self, titles, threshold=0.8):
+        """Score a batch of titles in one pass.
+
+        IDF is computed once over the index plus the whole batch, so scores can
+        differ slightly from per-title ``is_similar`` calls for titles sitting
+        right at the threshold. Returns ``(batch_vs_index, keys, batch_vs_batch)``
+        where ``batch_vs_index`` only has columns for the index entries that
+        survive prefix filtering, labelled by ``keys``.
+        """
+        with self._lock:
+            batch_counts = [Counter(tokenize(title)) for title in titles]
+            batch_df = Counter(token for counts in batch_counts for token in counts)
+            idf = self._idf_function(len(self._docs) + len(titles), batch_df)
+            batch_weights = [self._weights(counts, idf) for counts in batch_counts]
+            keys = set()
+            for weights in batch_weights:
+                keys.update(self._candidates(weights, threshold))
+            keys = sorted(keys, key=str)
+            index_weights = [self._weights(self._docs[key], idf) for key in keys]
+
+        vocab = {}
+        batch_parts = _csr_parts(batch_weights, vocab)
+        index_parts = _csr_parts(index_weights, vocab)
+        batch_matrix = sparse.csr_matrix(batch_parts, shape=(len(batch_weights), len(vocab)))
+        index_matrix = sparse.csr_matrix(index_parts, shape=(len(index_weights), len(vocab)))
+        return (batch_matrix @ index_matrix.T).tocsr(), keys, (batch_matrix @ batch_matrix.T).tocsr()
+
+def _csr_parts(rows, vocab):
+    data, indices, indptr = [], [], [0]
+    for weights in rows:
+        for token, weight in weights.items():
+            indices.append(vocab.setdefault(token, len(vocab)))
+            data.append(weight)
+        indptr.append(len(indices))
+    return data, indices, indptr
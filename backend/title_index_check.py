@@ -0,0 +1,73 @@
+import sys
+import random
+import argparse
+from .title_index import TitleIndex
+
+# Checks that TitleIndex makes the same decisions as the TfidfVectorizer
+# cosine check it replaced. Each title is compared against every title before
+# it, the way the catalogue grows. Needs scikit-learn, which the app itself no
+# longer uses.
+#
+#   python -m backend.title_index_check [titles.txt] [--threshold 0.8] [--limit 500]
+#
+# Without a file the titles come from the catalogue. Exits with status 1 if any
+# decision differs by more than TOLERANCE from the reference cosine.
+
+TOLERANCE = 1e-9
+
+def reference_similarity(new_title, existing_titles):
+    """The highest cosine ``file_manager.is_title_similar`` used to compute."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    try:
+        matrix = TfidfVectorizer().fit_transform(existing_titles + [new_title])
+    except ValueError:
+        return 0.0  # no title has a single token
+    return float(cosine_similarity(matrix[-1], matrix[:-1]).max())
+
+def compare(titles, threshold=0.8):
+    """Return ``(checked, mismatches)``, mismatches being ``(title, reference_cosine, index_decision)``."""
+    index = TitleIndex()
+    mismatches = []
+    for position, title in enumerate(titles):
+        if position:
+            cosine = reference_similarity(title, titles[:position])
+            decision = index.is_similar(title, threshold)
+            if decision != (cosine >= threshold) and abs(cosine - threshold) > TOLERANCE:
+                mismatches.append((title, cosine, decision))
+        index.add(position, title)
+    return max(0, len(titles) - 1), mismatches
+
+def catalogue_titles():
+    from .catalogue_store import CatalogueStore
+    store = CatalogueStore()
+    try:
+        return [video['title'] for video in store.downloaded_videos() + store.search_results()]
+    finally:
+        store.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare TitleIndex decisions with the TF-IDF cosine check.")
+    parser.add_argument("corpus", nargs="?", help="File with one title per line (default: the catalogue)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--limit", type=int, default=500, help="Check a random sample of this many titles")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            titles = [line.strip() for line in f if line.strip()]
+    else:
+        titles = catalogue_titles()
+    if len(titles) > args.limit:
+        titles = random.Random(args.seed).sample(titles, args.limit)
+
+    checked, mismatches = compare(titles, args.threshold)
+    for title, cosine, decision in mismatches:
+        print(f"MISMATCH cosine={cosine:.12f} index={'similar' if decision else 'new'}: {title}")
+    print(f"{checked} titles checked at threshold {args.threshold}: {len(mismatches)} mismatches "
+          f"(tolerance {TOLERANCE:g})")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,11 @@
 import re
 import emoji
 import random
-import nltk
-from nltk.corpus import wordnet
 import logging
 
 logging.basicConfig(filename='crop_debug.log', level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
-
 SYNONYMS = {
     'fight': ['battle', 'brawl', 'clash', 'duel', 'scuffle'],
     'scene': ['sequence', 'clip', 'moment', 'segment'],
@@ -30,10 +23,21 @@ def clean_title(title):
     title = re.sub(r'\s+', ' ', title).strip()
     return title
 
+def load_wordnet():
+    # nltk pulls in tkinter, so it is only imported when a synonym lookup needs it
+    import nltk
+    try:
+        nltk.data.find('corpora/wordnet')
+    except LookupError:
+        nltk.download('wordnet')
+    from nltk.corpus import wordnet
+    return wordnet
+
 def get_synonym(word):
     word_lower = word.lower()
     if word_lower in SYNONYMS:
         return random.choice(SYNONYMS[word_lower])
+    wordnet = load_wordnet()
     synsets = wordnet.synsets(word_lower)
     if synsets:
         synonyms = [lemma.name() for synset in synsets for lemma in synset.lemmas()]
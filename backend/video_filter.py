@@ -0,0 +1,65 @@
+DOWNLOAD_FILTER = {
+    'max_duration': 30 * 60,
+    'min_duration': None,
+    'min_views': None,
+    'blocked_channels': (),
+    'allowed_availability': ('public', 'unlisted'),
+    'rank_by': None,
+}
+
+RANKINGS = {
+    'views': lambda video: -(video.get('view_count') or 0),
+    'duration': lambda video: video.get('duration') or float('inf'),
+}
+
+class VideoFilter:
+    """Pre-download filter and ranking over catalogue metadata.
+
+    Videos with unknown metadata (older catalogue entries, or fields the
+    flat extraction did not return) are never rejected on that field.
+    ``rank_by`` is ``None`` to keep catalogue order, ``'views'`` for most
+    viewed first or ``'duration'`` for shortest first.
+    """
+
+    def __init__(self, max_duration=None, min_duration=None, min_views=None, blocked_channels=(),
+                 allowed_availability=None, rank_by=None):
+        self.max_duration = max_duration
+        self.min_duration = min_duration
+        self.min_views = min_views
+        self.blocked_channels = {channel.lower() for channel in blocked_channels}
+        self.allowed_availability = set(allowed_availability) if allowed_availability else None
+        self.rank_by = rank_by
+
+    @classmethod
+    def from_config(cls, config=None):
+        return cls(**{**DOWNLOAD_FILTER, **(config or {})})
+
+    def reject_reason(self, video):
+        duration = video.get('duration')
+        views = video.get('view_count')
+        channel = video.get('channel')
+        availability = video.get('availability')
+        if duration is not None and self.max_duration is not None and duration > self.max_duration:
+            return f"longer than {self.max_duration} seconds"
+        if duration is not None and self.min_duration is not None and duration < self.min_duration:
+            return f"shorter than {self.min_duration} seconds"
+        if views is not None and self.min_views is not None and views < self.min_views:
+            return f"fewer than {self.min_views} views"
+        if channel and channel.lower() in self.blocked_channels:
+            return f"blocked channel {channel}"
+        if availability and self.allowed_availability is not None and availability not in self.allowed_availability:
+            return f"availability is {availability}"
+        return None
+
+    def apply(self, videos):
+        accepted = []
+        rejected = []
+        for video in videos:
+            reason = self.reject_reason(video)
+            if reason:
+                rejected.append((video, reason))
+            else:
+                accepted.append(video)
+        if self.rank_by:
+            accepted.sort(key=RANKINGS[self.rank_by])
+        return accepted, rejected
@@ -2,9 +2,10 @@ import os
 import json
 import logging
 from tkinter import filedialog
-import ffmpeg
 from backend.downloader import Downloader
 from backend.editor import Editor
+from backend.media_cache import media_cache
+from backend.batch_render import BatchRenderer, collect_inputs, load_edit_recipe, save_edit_recipe
 from backend.utils import clean_title
 
 class EventHandler:
@@ -53,12 +54,11 @@ class EventHandler:
             self.ui.video_info.set("No video found in 'videos' folder.")
             return
         try:
-            probe = ffmpeg.probe(video_path)
-            video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
+            video_stream = media_cache.video_stream(video_path)
             if video_stream:
                 width = video_stream.get('width', 'Unknown')
                 height = video_stream.get('height', 'Unknown')
-                duration = float(probe['format'].get('duration', 0))
+                duration = media_cache.duration(video_path)
                 info = f"Title: {os.path.basename(video_path)}\nResolution: {width}x{height}\nDuration: {duration:.2f} seconds"
                 self.ui.video_info.set(info)
                 self.ui.video_title.set(clean_title(os.path.basename(video_path)))
@@ -69,6 +69,25 @@ class EventHandler:
             self.ui.video_info.set(f"Error loading video info: {str(e)}")
             logging.error(f"Error updating video info: {str(e)}")
 
+    def run_job(self, name, label, work, on_done=None):
+        """Run ``work`` on a job thread; only one job per ``name`` at a time."""
+        def on_error(e):
+            self.ui.update_status(f"{label} failed: {str(e)}")
+        if self.ui.jobs.submit(name, work, on_done=on_done, on_error=on_error) is None:
+            self.ui.update_status(f"{label} is already running.")
+            return False
+        return True
+
+    def cancel_jobs(self):
+        cancelled = self.ui.jobs.cancel()
+        self.ui.update_status("Cancelling..." if cancelled else "Nothing to cancel.")
+
+    def warm_media_cache(self):
+        """Probe the videos folder in the background so selecting a video does not wait on ffprobe."""
+        video_paths = [os.path.join(self.videos_dir, file) for file in os.listdir(self.videos_dir)
+                       if file.lower().endswith(('.mp4', '.webm', '.mkv'))]
+        self.ui.jobs.submit("media_warmup", media_cache.warm, video_paths)
+
     def get_first_video(self):
         extensions = ('.mp4', '.webm', '.mkv')
         for file in os.listdir(self.videos_dir):
@@ -80,22 +99,28 @@ class EventHandler:
         url = self.ui.url_download_widget.url_input.get()
         resolution = self.ui.url_download_widget.resolution.get()
         extension = self.ui.url_download_widget.extension.get()
+        clip_duration = 60 if self.ui.url_download_widget.clips_only.get() else None
         if not url:
             self.ui.update_status("Please enter a URL.")
             return
-        try:
-            success, message = self.downloader.download_from_url(
+
+        def work():
+            return self.downloader.download_from_url(
                 url, resolution, extension,
-                progress_callback=self.ui.update_status
+                progress_callback=self.ui.update_status,
+                clip_duration=clip_duration,
+                download_progress=self.ui.report_progress
             )
+
+        def done(result):
+            success, message = result
             if success:
                 self.ui.selected_video_path.set(message)  # Set downloaded video path
                 self.update_video_info()
             else:
                 self.ui.update_status(message)
-        except Exception as e:
-            self.ui.update_status(f"Download failed: {str(e)}")
-            logging.error(f"Download failed: {str(e)}")
+
+        self.run_job("url_download", "Download", work, done)
 
     def search_videos(self):
         query = self.ui.search_controls_widget.custom_query.get() or self.ui.search_controls_widget.selected_query.get()
@@ -103,33 +128,33 @@ class EventHandler:
         if query == "Select a query or enter custom below":
             self.ui.update_status("Please select or enter a query.")
             return
-        try:
-            queries = [query]  # Single query for populate_search_results
-            self.downloader.populate_search_results(
-                queries, results_length,
-                progress_callback=self.ui.update_status
-            )
-        except Exception as e:
-            self.ui.update_status(f"Search failed: {str(e)}")
-            logging.error(f"Search failed: {str(e)}")
+        queries = [query]  # Single query for populate_search_results
+        # Search and download share the catalogue's title indexes, so they never run together
+        self.run_job("catalogue", "Search", lambda: self.downloader.populate_search_results(
+            queries, results_length,
+            progress_callback=self.ui.update_status
+        ))
 
     def download_videos(self):
         max_downloads = int(self.ui.search_controls_widget.max_downloads.get() or 1)
-        try:
-            success, video_paths = self.downloader.download_next_video(
+
+        def work():
+            return self.downloader.download_next_video(
                 progress_callback=self.ui.update_status,
                 max_downloads=max_downloads,
                 progress_updater=self.ui.update_progress
             )
+
+        def done(result):
+            success, video_paths = result
             if success and video_paths:
                 # Set the first downloaded video as selected
                 self.ui.selected_video_path.set(video_paths[0][0])
                 self.update_video_info()
             else:
                 self.ui.update_status("No videos downloaded.")
-        except Exception as e:
-            self.ui.update_status(f"Download failed: {str(e)}")
-            logging.error(f"Download failed: {str(e)}")
+
+        self.run_job("catalogue", "Download", work, done)
 
     def crop_video(self):
         video_path = self.ui.selected_video_path.get() or self.get_first_video()
@@ -143,12 +168,18 @@ class EventHandler:
             y2 = int(self.ui.crop_controls_widget.crop_y2.get() or 0)
             preserve_aspect = self.ui.crop_controls_widget.preserve_aspect.get()
             output_path = os.path.join(self.edited_dir, f"cropped_{os.path.basename(video_path)}")
-            self.editor.edit_video_crop(video_path, output_path, (x1, y1, x2, y2), self.ui.update_progress, preserve_aspect)
-            self.ui.update_status(f"Video cropped and saved to {output_path}")
-            logging.info(f"Video cropped: {output_path}")
         except Exception as e:
             self.ui.update_status(f"Crop failed: {str(e)}")
             logging.error(f"Crop failed: {str(e)}")
+            return
+
+        def done(success):
+            if success:
+                self.ui.update_status(f"Video cropped and saved to {output_path}")
+                logging.info(f"Video cropped: {output_path}")
+
+        self.run_job("crop", "Crop", lambda: self.editor.edit_video_crop(
+            video_path, output_path, (x1, y1, x2, y2), self.ui.update_status, preserve_aspect), done)
 
     def apply_overlays(self):
         video_path = self.ui.selected_video_path.get() or self.get_first_video()
@@ -170,12 +201,121 @@ class EventHandler:
                 'y': int(self.ui.overlay_controls_widget.text_y.get() or 10)
             } if self.ui.overlay_controls_widget.overlay_text.get() else None
             output_path = os.path.join(self.edited_dir, f"overlay_{os.path.basename(video_path)}")
-            self.editor.edit_video_overlays(video_path, output_path, overlay_params, text_params, self.ui.update_progress)
-            self.ui.update_status(f"Overlay applied and saved to {output_path}")
-            logging.info(f"Overlay applied: {output_path}")
         except Exception as e:
             self.ui.update_status(f"Overlay failed: {str(e)}")
             logging.error(f"Overlay failed: {str(e)}")
+            return
+
+        def done(success):
+            if success:
+                self.ui.update_status(f"Overlay applied and saved to {output_path}")
+                logging.info(f"Overlay applied: {output_path}")
+
+        self.run_job("overlays", "Overlay", lambda: self.editor.edit_video_overlays(
+            video_path, output_path, overlay_params, text_params, self.ui.update_status), done)
+
+    def current_recipe(self):
+        """Build an edit recipe from the Crop and Overlay tabs."""
+        crop = self.ui.crop_controls_widget
+        overlay = self.ui.overlay_controls_widget
+        recipe = {}
+        crop_params = [int(var.get() or 0) for var in (crop.crop_x1, crop.crop_y1, crop.crop_x2, crop.crop_y2)]
+        if crop_params[2] > crop_params[0] and crop_params[3] > crop_params[1]:
+            recipe['crop'] = crop_params
+            recipe['preserve_aspect'] = crop.preserve_aspect.get()
+        if overlay.overlay_text.get():
+            recipe['text'] = {
+                'text': overlay.overlay_text.get(),
+                'font_size': int(overlay.text_font_size.get() or 24),
+                'color': overlay.text_color.get() or 'white',
+                'x': int(overlay.text_x.get() or 10),
+                'y': int(overlay.text_y.get() or 10)
+            }
+        if overlay.overlay_image_path.get():
+            recipe['image'] = {
+                'path': overlay.overlay_image_path.get(),
+                'x': int(overlay.overlay_x.get() or 0),
+                'y': int(overlay.overlay_y.get() or 0),
+                'scale': float(overlay.overlay_scale.get() or 1.0)
+            }
+        return recipe
+
+    def render_edit(self):
+        """Render the edit shown in the preview, crop and overlays together, at full resolution."""
+        video_path = self.ui.selected_video_path.get() or self.get_first_video()
+        if not video_path:
+            self.ui.update_status("No video selected for rendering.")
+            return
+        try:
+            recipe = self.current_recipe()
+        except Exception as e:
+            self.ui.update_status(f"Render failed: {str(e)}")
+            logging.error(f"Render failed: {str(e)}")
+            return
+        if not recipe:
+            self.ui.update_status("Nothing to render: set a crop or an overlay first.")
+            return
+        output_path = os.path.join(self.edited_dir, f"edited_{os.path.basename(video_path)}")
+
+        def done(success):
+            if success:
+                logging.info(f"Edit rendered: {output_path}")
+
+        self.run_job("render", "Render", lambda: self.editor.edit_video_recipe(
+            video_path, output_path, recipe, self.ui.update_status), done)
+
+    def select_batch_folder(self):
+        folder = filedialog.askdirectory(initialdir=self.videos_dir, title="Select Folder to Batch Render")
+        if folder:
+            self.ui.batch_controls_widget.batch_source.set(folder)
+
+    def load_batch_recipe(self):
+        file_path = filedialog.askopenfilename(
+            initialdir=os.getcwd(),
+            title="Load Edit Recipe",
+            filetypes=(("Recipe files", "*.json"), ("All files", "*.*"))
+        )
+        if file_path:
+            self.ui.batch_controls_widget.recipe_path.set(file_path)
+            self.ui.update_status(f"Loaded recipe: {os.path.basename(file_path)}")
+
+    def save_batch_recipe(self):
+        file_path = filedialog.asksaveasfilename(
+            initialdir=os.getcwd(),
+            title="Save Edit Recipe",
+            defaultextension=".json",
+            filetypes=(("Recipe files", "*.json"), ("All files", "*.*"))
+        )
+        if not file_path:
+            return
+        try:
+            save_edit_recipe(file_path, self.current_recipe())
+            self.ui.batch_controls_widget.recipe_path.set(file_path)
+            self.ui.update_status(f"Recipe saved to {file_path}")
+            logging.info(f"Recipe saved: {file_path}")
+        except Exception as e:
+            self.ui.update_status(f"Saving recipe failed: {str(e)}")
+            logging.error(f"Saving recipe failed: {str(e)}")
+
+    def batch_render(self):
+        batch = self.ui.batch_controls_widget
+        try:
+            inputs = collect_inputs(batch.batch_source.get() or self.videos_dir)
+            if not inputs:
+                self.ui.update_status("No videos found to batch render.")
+                return
+            recipe = load_edit_recipe(batch.recipe_path.get()) if batch.recipe_path.get() else self.current_recipe()
+            renderer = BatchRenderer(
+                int(batch.batch_jobs.get()) if batch.batch_jobs.get() else None,
+                int(batch.batch_threads.get()) if batch.batch_threads.get() else None,
+                output_dir=os.path.join(self.edited_dir, "batch")
+            )
+        except Exception as e:
+            self.ui.update_status(f"Batch render failed: {str(e)}")
+            logging.error(f"Batch render failed: {str(e)}")
+            return
+        self.run_job("batch", "Batch render", lambda: renderer.run(
+            recipe, inputs, progress_callback=self.ui.update_status, progress_updater=self.ui.update_progress))
 
     def auto_rename(self):
         video_path = self.ui.selected_video_path.get() or self.get_first_video()
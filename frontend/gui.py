@@ -7,9 +7,11 @@ from .widgets.url_download import URLDownloadWidget
 from .widgets.search_controls import SearchControlsWidget
 from .widgets.crop_controls import CropControlsWidget
 from .widgets.overlay_controls import OverlayControlsWidget
-from PIL import Image, ImageTk
-import io
-import ffmpeg
+from .widgets.batch_controls import BatchControlsWidget
+from .jobs import JobExecutor
+from .log_sink import LogSink
+from .preview import PreviewEngine
+from backend.child_processes import kill_all
 import os
 
 class VideoSearchDownloadUI:
@@ -20,7 +22,8 @@ class VideoSearchDownloadUI:
         self.event_handler = event_handler
         self.style = Style()
         self.selected_video_path = tk.StringVar(value="")
-        self.preview_image = None  # Store preview image reference
+        self.jobs = JobExecutor(root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
 
     def create_widgets(self):
@@ -45,6 +48,7 @@ class VideoSearchDownloadUI:
         self.progress = tk.DoubleVar(value=0.0)
         self.progress_bar = ttk.Progressbar(self.search_download_tab, variable=self.progress, maximum=100, bootstyle=SUCCESS)
         self.progress_bar.pack(pady=5, padx=20, fill=X)
+        ttk.Button(self.search_download_tab, text="Cancel", command=self.event_handler.cancel_jobs, bootstyle=DANGER).pack(pady=5)
 
         self.status_text = tk.StringVar(value="Ready")
         ttk.Label(self.search_download_tab, textvariable=self.status_text, wraplength=650, bootstyle=INFO).pack(pady=5)
@@ -55,6 +59,7 @@ class VideoSearchDownloadUI:
         scrollbar = ttk.Scrollbar(self.search_download_tab, orient=VERTICAL, command=self.log_text.yview, bootstyle=SECONDARY)
         scrollbar.pack(side=RIGHT, fill=Y, pady=5)
         self.log_text['yscrollcommand'] = scrollbar.set
+        self.log_sink = LogSink(self.root, self.log_text, self.status_text, self.progress)
 
     def setup_edit_tab(self):
         main_pane = ttk.PanedWindow(self.edit_tab, orient=HORIZONTAL)
@@ -107,6 +112,18 @@ class VideoSearchDownloadUI:
         ttk.Label(preview_frame, text="Preview", bootstyle=SECONDARY, font=("Arial", 12, "bold")).pack(pady=5)
         self.preview_canvas = tk.Canvas(preview_frame, width=400, height=225, bg="black", highlightthickness=0)
         self.preview_canvas.pack(pady=5, padx=10)
+        self.preview = PreviewEngine(self.preview_canvas, self.jobs, on_loaded=self.on_preview_loaded)
+        scrub_frame = ttk.Frame(preview_frame)
+        scrub_frame.pack(pady=5, padx=10, fill=X)
+        self.preview_position = tk.DoubleVar(value=0.0)
+        self.preview_scrubber = ttk.Scale(scrub_frame, from_=0, to=1, variable=self.preview_position,
+                                          command=self.scrub_preview, bootstyle=INFO)
+        self.preview_scrubber.pack(side=LEFT, fill=X, expand=True)
+        self.preview_time = tk.StringVar(value="")
+        ttk.Label(scrub_frame, textvariable=self.preview_time, width=14, bootstyle=SECONDARY).pack(side=LEFT, padx=5)
+        render_edit = ttk.Button(preview_frame, text="Render Full Resolution", command=self.event_handler.render_edit, bootstyle=PRIMARY)
+        render_edit.pack(pady=5)
+        ToolTip(render_edit, text="Render the crop and overlays shown in the preview at full resolution", bootstyle=INFO)
 
         controls_frame = ttk.Frame(right_panel)
         right_panel.add(controls_frame, weight=1)
@@ -117,8 +134,10 @@ class VideoSearchDownloadUI:
 
         crop_tab = ttk.Frame(edit_notebook)
         overlay_tab = ttk.Frame(edit_notebook)
+        batch_tab = ttk.Frame(edit_notebook)
         edit_notebook.add(crop_tab, text="Crop")
         edit_notebook.add(overlay_tab, text="Overlay")
+        edit_notebook.add(batch_tab, text="Batch")
 
         self.crop_controls_widget = CropControlsWidget(crop_tab, self.event_handler)
         self.crop_controls_widget.pack(pady=5, padx=10, fill=X)
@@ -126,9 +145,14 @@ class VideoSearchDownloadUI:
         self.overlay_controls_widget = OverlayControlsWidget(overlay_tab, self.event_handler)
         self.overlay_controls_widget.pack(pady=5, padx=10, fill=X)
 
+        self.batch_controls_widget = BatchControlsWidget(batch_tab, self.event_handler)
+        self.batch_controls_widget.pack(pady=5, padx=10, fill=X)
+
         ttk.Label(self.edit_tab, text="Note: Edits the selected or first video in 'videos' folder. Output saved to 'Edited' folder.",
                   font=("Arial", 8, "italic"), bootstyle=SECONDARY).pack(pady=5)
 
+        self.trace_edit_controls()
+
         # Initialize preview for default video
         self.update_preview()
 
@@ -146,34 +170,64 @@ class VideoSearchDownloadUI:
         entry.bind("<Button-3>", show_context_menu)
 
     def update_status(self, message):
-        self.status_text.set(message)
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
-        self.root.update()
+        """Queue a status message for the next log flush; safe to call from job threads."""
+        if not self.jobs.on_tk_thread():
+            self.jobs.checkpoint()
+        self.log_sink.write(message)
+
+    def report_progress(self, message):
+        """Like ``update_status`` for frequent progress lines, which are thinned out per job."""
+        if not self.jobs.on_tk_thread():
+            self.jobs.checkpoint()
+        job = self.jobs.current_job()
+        self.log_sink.progress(job.name if job else None, message)
 
     def update_progress(self, value):
-        self.progress.set(value)
-        self.root.update()
+        """Move the progress bar at the next log flush; safe to call from job threads."""
+        if not self.jobs.on_tk_thread():
+            self.jobs.checkpoint()
+        self.log_sink.set_progress(value)
+
+    def on_close(self):
+        self.jobs.shutdown()
+        # Encodes never reach a cancellation checkpoint, so their ffmpeg processes are killed outright
+        kill_all()
+        self.preview.close()
+        self.log_sink.close()
+        self.root.destroy()
+
+    def trace_edit_controls(self):
+        """Redraw the edit preview whenever a Crop or Overlay control changes."""
+        crop = self.crop_controls_widget
+        overlay = self.overlay_controls_widget
+        for var in (crop.crop_x1, crop.crop_y1, crop.crop_x2, crop.crop_y2, crop.preserve_aspect,
+                    overlay.overlay_image_path, overlay.overlay_x, overlay.overlay_y, overlay.overlay_scale,
+                    overlay.overlay_text, overlay.text_font_size, overlay.text_color, overlay.text_x, overlay.text_y):
+            var.trace_add('write', self.refresh_edit_preview)
+
+    def refresh_edit_preview(self, *args):
+        try:
+            recipe = self.event_handler.current_recipe()
+        except ValueError:
+            return  # A number is half typed; keep showing the last valid edit
+        self.preview.set_edit(recipe)
 
     def update_preview(self):
-        """Update the preview canvas with a frame from the selected video."""
+        """Load the selected video into the preview canvas and scrubber."""
         video_path = self.selected_video_path.get()
         self.preview_canvas.delete("all")  # Clear previous content
+        self.preview_time.set("")
         if not video_path or not os.path.exists(video_path):
+            self.preview.close()
             self.preview_canvas.create_text(200, 112.5, text="No video selected", fill="white", font=("Arial", 10))
             return
-        try:
-            probe = ffmpeg.probe(video_path)
-            video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-            if not video_stream:
-                raise ValueError("No video stream found")
-            width, height = int(video_stream['width']), int(video_stream['height'])
-            scale = min(400/width, 225/height)
-            frame = ffmpeg.input(video_path, ss=1).filter('scale', int(width*scale), int(height*scale)).output('pipe:', format='image2', vframes=1).run(capture_stdout=True)[0]
-            image = Image.open(io.BytesIO(frame))
-            self.preview_image = ImageTk.PhotoImage(image)
-            self.preview_canvas.create_image(0, 0, anchor='nw', image=self.preview_image)
-        except Exception as e:
-            self.preview_canvas.create_text(200, 112.5, text=f"Preview Error: {str(e)}", fill="white", font=("Arial", 10))
\ No newline at end of file
+        self.preview.load(video_path)
+
+    def on_preview_loaded(self, duration):
+        self.preview_scrubber.configure(to=max(duration, 0.01))
+        self.preview_position.set(min(1.0, duration))
+        self.preview_time.set(f"{min(1.0, duration):.1f} / {duration:.1f} s")
+
+    def scrub_preview(self, value):
+        self.preview.scrub(float(value))
+        self.preview_time.set(f"{self.preview.position:.1f} / {self.preview.duration:.1f} s")
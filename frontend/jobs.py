@@ -0,0 +1,135 @@
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL_MS = 16  # one frame at 60 fps
+POLL_BUDGET = 200  # callbacks run per poll, so a flood of messages cannot stall a frame
+JOB_WORKERS = 4
+
+class JobCancelled(BaseException):
+    """Raised inside a job once it has been cancelled.
+
+    It derives from BaseException so the backend's ``except Exception``
+    error handling lets it through and the job actually stops.
+    """
+
+class Job:
+    def __init__(self, name):
+        self.name = name
+        self._cancelled = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+
+class JobExecutor:
+    """Runs long actions on worker threads and hands their results back to Tk.
+
+    Workers never touch widgets: anything that has to run on the Tk thread
+    goes through ``call_soon`` into a queue that ``root.after`` drains every
+    frame. Each job has a name and only one job per name runs at a time, so
+    clicking a button twice cannot start its action twice, while different
+    actions run side by side. Cancellation is cooperative: the job stops at
+    its next progress report.
+    """
+
+    def __init__(self, root, max_workers=JOB_WORKERS):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def call_soon(self, fn, *args):
+        """Run ``fn(*args)`` on the Tk thread; safe to call from any thread."""
+        self._queue.put((fn, args))
+
+    def on_tk_thread(self):
+        return threading.current_thread() is threading.main_thread()
+
+    def current_job(self):
+        return getattr(self._local, 'job', None)
+
+    def checkpoint(self):
+        """Raise ``JobCancelled`` if the job running on this thread has been cancelled."""
+        job = self.current_job()
+        if job:
+            job.check()
+
+    def is_running(self, name):
+        with self._lock:
+            return name in self._jobs
+
+    def submit(self, name, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Start ``fn(*args, **kwargs)`` as job ``name``; returns None if it is already running.
+
+        ``on_done(result)`` and ``on_error(exception)`` are called on the Tk
+        thread; a cancelled job calls neither.
+        """
+        with self._lock:
+            if self._closed or name in self._jobs:
+                return None
+            job = Job(name)
+            self._jobs[name] = job
+
+        def run():
+            self._local.job = job
+            callback = None
+            try:
+                result = fn(*args, **kwargs)
+            except JobCancelled:
+                logging.info(f"Job {name} cancelled")
+            except Exception as e:
+                logging.error(f"Job {name} failed: {str(e)}")
+                callback = (on_error, e)
+            else:
+                if not job.cancelled:
+                    callback = (on_done, result)
+            finally:
+                self._local.job = None
+                with self._lock:
+                    self._jobs.pop(name, None)
+            # Queued only once the job is gone, so a callback may start the same job again
+            if callback and callback[0]:
+                self.call_soon(*callback)
+
+        job.future = self._executor.submit(run)
+        return job
+
+    def cancel(self, name=None):
+        """Cancel job ``name``, or every running job; returns how many were cancelled."""
+        with self._lock:
+            jobs = [self._jobs[name]] if name in self._jobs else [] if name else list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def _poll(self):
+        for _ in range(POLL_BUDGET):
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.error(f"UI callback {getattr(fn, '__name__', fn)} failed: {str(e)}")
+        if not self._closed:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def shutdown(self):
+        self._closed = True
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
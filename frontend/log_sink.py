@@ -0,0 +1,121 @@
+import time
+import threading
+import logging
+from collections import deque
+import tkinter as tk
+
+LOG_FLUSH_MS = 100
+LOG_VISIBLE_LINES = 500
+LOG_HISTORY_FILE = "status_history.log"
+PROGRESS_INTERVAL = 0.5  # seconds between progress lines shown for one job
+
+class LogSink:
+    """Batches status messages into the log widget a few times a second.
+
+    ``write`` and ``progress`` only append to a buffer and may be called
+    from any thread; a ``root.after`` loop flushes the buffer as one
+    insert, updates the status line and progress bar once, and appends
+    the lines to ``history_path``. The widget keeps the last
+    ``max_lines`` lines, so its size stays fixed however long the session
+    runs. Progress messages are kept per job and only the latest one is
+    shown, at most once every ``progress_interval`` seconds, so a fast
+    download costs the UI the same as a slow one. A ``write`` first queues
+    any progress not yet shown, so lines always appear in the order they
+    were reported.
+    """
+
+    def __init__(self, root, text_widget, status_var, progress_var=None, flush_ms=LOG_FLUSH_MS,
+                 max_lines=LOG_VISIBLE_LINES, history_path=LOG_HISTORY_FILE, progress_interval=PROGRESS_INTERVAL):
+        self.root = root
+        self.text_widget = text_widget
+        self.status_var = status_var
+        self.progress_var = progress_var
+        self.flush_ms = flush_ms
+        self.progress_interval = progress_interval
+        self.lines = deque(maxlen=max_lines)
+        self._pending = []
+        self._progress = {}
+        self._progress_shown = {}
+        self._progress_value = None
+        self._lock = threading.Lock()
+        self._closed = False
+        try:
+            self._history = open(history_path, 'a', encoding='utf-8')
+        except OSError as e:
+            logging.warning(f"Status history disabled, cannot open {history_path}: {str(e)}")
+            self._history = None
+        self.root.after(self.flush_ms, self._flush_loop)
+
+    def write(self, message):
+        with self._lock:
+            # Unshown progress goes ahead of the message, or it could land after a job's final status
+            self._pending.extend(self._progress.values())
+            self._progress.clear()
+            self._pending.append(message)
+
+    def progress(self, key, message):
+        """Report transient progress for job ``key``; newer messages replace unshown ones."""
+        with self._lock:
+            self._progress[key] = message
+
+    def set_progress(self, value):
+        with self._lock:
+            self._progress_value = value
+
+    def _take(self):
+        now = time.monotonic()
+        with self._lock:
+            lines = []
+            for key, message in list(self._progress.items()):
+                if now - self._progress_shown.get(key, 0.0) >= self.progress_interval:
+                    self._progress_shown[key] = now
+                    lines.append(message)
+                    del self._progress[key]
+            lines.extend(self._pending)
+            self._pending = []
+            value, self._progress_value = self._progress_value, None
+        return lines, value
+
+    def _spill(self, lines):
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._history.write("".join(f"{stamp} {line}\n" for line in lines))
+        self._history.flush()
+
+    def flush(self):
+        lines, value = self._take()
+        if value is not None and self.progress_var is not None:
+            self.progress_var.set(value)
+        if not lines:
+            return
+        if self._history:
+            self._spill(lines)
+        self.status_var.set(lines[-1])
+        # Lines that would scroll out before they are ever drawn only go to the history file
+        visible = lines[-self.lines.maxlen:]
+        self.lines.extend(visible)
+        self.text_widget.config(state='normal')
+        self.text_widget.insert(tk.END, "".join(line + "\n" for line in visible))
+        excess = int(self.text_widget.index('end-1c').split('.')[0]) - 1 - len(self.lines)
+        if excess > 0:
+            self.text_widget.delete('1.0', f'{excess + 1}.0')
+        self.text_widget.see(tk.END)
+        self.text_widget.config(state='disabled')
+
+    def _flush_loop(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Status log flush failed: {str(e)}")
+        if not self._closed:
+            self.root.after(self.flush_ms, self._flush_loop)
+
+    def close(self):
+        self._closed = True
+        if self._history:
+            # Whatever is still buffered at exit belongs in the history even if it is never drawn
+            lines, _ = self._take()
+            with self._lock:
+                lines.extend(self._progress.values())
+            self._spill(lines)
+            self._history.close()
+            self._history = None
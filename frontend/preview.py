@@ -0,0 +1,441 @@
+import os
+import bisect
+import hashlib
+import subprocess
+import logging
+from collections import OrderedDict
+import ffmpeg
+from PIL import Image, ImageTk
+from backend.media_cache import media_cache
+from backend.frame_pipeline import QUIET_ARGS, FramePipelineError
+from backend.overlay_assets import overlay_assets
+from backend.edit_graph import resolve_crop
+from backend.proxy import make_proxy, run_interruptible
+from backend.child_processes import spawn
+
+PREVIEW_WIDTH = 400
+PREVIEW_HEIGHT = 225
+PREVIEW_FRAME_CACHE = 96  # PhotoImages kept, about 35 MB at full preview size
+SPRITE_CACHE_DIR = os.path.join(".cache", "sprites")
+SPRITE_COLUMNS = 8
+SPRITE_ROWS = 8
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+SCRUB_SETTLE_MS = 120  # exact frames are decoded once the scrubber rests this long
+READAHEAD_SECONDS = 0.5  # closer seeks read on from the running decoder instead of restarting it
+START_SECONDS = 1.0
+JOB_RETRY_MS = 100  # how soon a replaced preview job is retried once the old one has been cancelled
+EDIT_SETTLE_MS = 50  # typing into the edit controls redraws at most this often
+CROP_OUTLINE = "yellow"
+
+def fit_size(width, height, max_width, max_height):
+    scale = min(max_width / width, max_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+def snap_to_keyframe(keyframes, t):
+    """The keyframe time closest to ``t``; ``t`` itself when there are none."""
+    if not keyframes:
+        return t
+    pos = bisect.bisect_left(keyframes, t)
+    return min(keyframes[max(0, pos - 1):pos + 1], key=lambda keyframe: abs(keyframe - t))
+
+def build_sprite_sheet(video_path, duration, keyframes=None, cache_dir=SPRITE_CACHE_DIR, columns=SPRITE_COLUMNS,
+                       rows=SPRITE_ROWS, thumb_width=THUMB_WIDTH, thumb_height=THUMB_HEIGHT, checkpoint=None):
+    """Render ``columns`` x ``rows`` evenly spaced thumbnails into one PNG; returns its path.
+
+    One ffmpeg pass with ``fps`` and ``tile`` does it. When the file has a
+    keyframe for every thumbnail only keyframes are decoded, which is what
+    keyframe-snapped seeking shows anyway. Sheets are cached per path,
+    size and mtime. ``checkpoint`` is passed to ``run_interruptible``.
+    """
+    stat = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}:{columns}x{rows}:{thumb_width}x{thumb_height}"
+    sheet_path = os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".png")
+    if os.path.exists(sheet_path):
+        return sheet_path
+    os.makedirs(cache_dir, exist_ok=True)
+    count = columns * rows
+    input_args = {'skip_frame': 'nokey'} if keyframes and len(keyframes) >= count else {}
+    stream = (ffmpeg.input(video_path, **input_args).video
+              .filter('fps', fps=f"{count}/{max(duration, 1e-3):.6f}")
+              .filter('scale', thumb_width, thumb_height, force_original_aspect_ratio='decrease')
+              .filter('pad', thumb_width, thumb_height, '(ow-iw)/2', '(oh-ih)/2')
+              .filter('tile', f"{columns}x{rows}"))
+    run_interruptible(stream, sheet_path, checkpoint, vframes=1)
+    return sheet_path
+
+class FrameDecoder:
+    """An ffmpeg process decoding one video to preview-sized RGB frames.
+
+    The process only decodes forward, so it is kept for seeks up to
+    ``READAHEAD_SECONDS`` ahead of the current position; any other seek
+    kills it and starts a new one at the requested time. On an all-intra
+    proxy that restart decodes a single frame. Not thread-safe.
+    """
+
+    def __init__(self, video_path, width, height, frame_rate):
+        self.video_path = video_path
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.frame_size = width * height * 3
+        self._process = None
+        self._start = 0.0
+        self._frames_read = 0
+
+    @property
+    def position(self):
+        return self._start + max(0, self._frames_read - 1) / self.frame_rate
+
+    def _restart(self, t):
+        self.close()
+        args = (ffmpeg.input(self.video_path, ss=f"{t:.6f}")
+                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s=f"{self.width}x{self.height}", an=None)
+                .global_args(*QUIET_ARGS).compile())
+        self._process = spawn(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._start = t
+        self._frames_read = 0
+
+    def _read(self):
+        data = self._process.stdout.read(self.frame_size)
+        if len(data) < self.frame_size:
+            raise FramePipelineError(f"No frame at {self.position:.2f}s in {self.video_path}")
+        self._frames_read += 1
+        return data
+
+    def frame_at(self, t):
+        """The frame at ``t`` seconds as a PIL image."""
+        ahead = t - self.position
+        if self._process is None or self._frames_read == 0 or not 0 < ahead <= READAHEAD_SECONDS:
+            self._restart(t)
+        data = self._read()
+        while self.position + 0.5 / self.frame_rate < t:
+            data = self._read()
+        return Image.frombytes('RGB', (self.width, self.height), data)
+
+    def close(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.stdout.close()
+            self._process.wait()
+            self._process = None
+
+class PreviewEngine:
+    """Frames for the preview canvas: sprite-sheet thumbnails while scrubbing, decoded frames once it settles.
+
+    Frames come from an all-intra proxy once one is built, and are drawn
+    under the canvas tag ``frame``; ``set_edit`` draws the edit recipe
+    over them under the tag ``edit``.
+    """
+
+    def __init__(self, canvas, jobs, width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT,
+                 max_frames=PREVIEW_FRAME_CACHE, on_loaded=None):
+        self.canvas = canvas
+        self.jobs = jobs
+        self.width = width
+        self.height = height
+        self.max_frames = max_frames
+        self.on_loaded = on_loaded
+        self.video_path = None
+        self.duration = 0.0
+        self.position = 0.0
+        self.frame_size = None
+        self._keyframes = []
+        self._sheet = None
+        self._frames = OrderedDict()
+        self._decoder = None
+        self._wanted = None
+        self._settle_id = None
+        self._generation = 0
+        self.current_image = None
+        self.source_size = None
+        self._proxy = None
+        self._frame_rates = {}
+        self._recipe = {}
+        self._edit_id = None
+        self._edit_images = []
+        self._running = {}
+
+    def load(self, video_path):
+        """Switch to ``video_path`` and show its frame at ``START_SECONDS``."""
+        self._generation += 1
+        self.video_path = video_path
+        self.duration = 0.0
+        self._keyframes = []
+        self.frame_size = None
+        self.source_size = None
+        self._proxy = None
+        self._sheet = None
+        self._wanted = None
+        self._frames.clear()
+        self.canvas.delete("edit")
+        for running_path, job in self._running.values():
+            if running_path != video_path:
+                job.cancel()
+
+        def work():
+            video_stream = media_cache.video_stream(video_path)
+            if not video_stream:
+                raise ValueError("No video stream found")
+            self.jobs.checkpoint()
+            duration, keyframes = media_cache.keyframes(video_path)
+            source_size = int(video_stream['width']), int(video_stream['height'])
+            return duration, keyframes, source_size
+
+        def done(result):
+            self.duration, self._keyframes, self.source_size = result
+            self.frame_size = fit_size(*self.source_size, self.width, self.height)
+            if self.on_loaded:
+                self.on_loaded(self.duration)
+            self.show(min(START_SECONDS, self.duration))
+            self._draw_edit()
+            self._build_sheet()
+            self._build_proxy()
+
+        self._run_latest("load", video_path, work, done, self.show_error)
+
+    def _run_latest(self, kind, video_path, work, on_done, on_error):
+        """Run ``work`` as the one ``preview_<kind>`` job, for the video being previewed.
+
+        A job already running for the same video is kept and its result
+        used. One left over from another video is cancelled, and this one
+        starts as soon as it has stopped. Results that arrive after the
+        preview moved on to another video are dropped.
+        """
+        if video_path != self.video_path:
+            return
+        name = f"preview_{kind}"
+        running = self._running.get(kind)
+        if self.jobs.is_running(name):
+            if running and running[0] == video_path and not running[1].cancelled:
+                return
+            self.jobs.cancel(name)
+            self.canvas.after(JOB_RETRY_MS, lambda: self._run_latest(kind, video_path, work, on_done, on_error))
+            return
+
+        def done(result):
+            if video_path == self.video_path:
+                on_done(result)
+
+        def failed(e):
+            if video_path == self.video_path:
+                on_error(e)
+
+        job = self.jobs.submit(name, work, on_done=done, on_error=failed)
+        if job is None:
+            self.canvas.after(JOB_RETRY_MS, lambda: self._run_latest(kind, video_path, work, on_done, on_error))
+        else:
+            self._running[kind] = (video_path, job)
+
+    def _build_sheet(self):
+        video_path, duration, keyframes = self.video_path, self.duration, self._keyframes
+
+        def work():
+            with Image.open(build_sprite_sheet(video_path, duration, keyframes, checkpoint=self.jobs.checkpoint)) as sheet:
+                return sheet.convert('RGB')
+
+        def done(sheet):
+            self._sheet = sheet
+
+        def failed(e):
+            logging.warning(f"No sprite sheet for {video_path}: {str(e)}")
+
+        self._run_latest("sheet", video_path, work, done, failed)
+
+    def _build_proxy(self):
+        video_path = self.video_path
+
+        def done(proxy):
+            self._proxy = proxy
+
+        def failed(e):
+            logging.warning(f"No proxy for {video_path}, previewing the source: {str(e)}")
+
+        self._run_latest("proxy", video_path, lambda: make_proxy(video_path, checkpoint=self.jobs.checkpoint),
+                         done, failed)
+
+    def snap(self, t):
+        t = max(0.0, min(t, self.duration))
+        if self._proxy:
+            # Every proxy frame is a keyframe, so snap to the nearest frame instead
+            frame_rate = self._frame_rate(self.video_path)
+            return min(round(t * frame_rate), max(0, int(self.duration * frame_rate) - 1)) / frame_rate
+        return snap_to_keyframe(self._keyframes, t)
+
+    def _cache_get(self, key):
+        photo = self._frames.get(key)
+        if photo is not None:
+            self._frames.move_to_end(key)
+        return photo
+
+    def _cache_put(self, key, photo):
+        self._frames[key] = photo
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+
+    def _draw(self, photo):
+        self.current_image = photo
+        self.canvas.delete("frame")
+        self.canvas.create_image(0, 0, anchor='nw', image=photo, tags="frame")
+        self.canvas.tag_lower("frame")
+
+    def _thumbnail(self, t):
+        if self._sheet is None or not self.duration:
+            return None
+        count = SPRITE_COLUMNS * SPRITE_ROWS
+        index = min(count - 1, int(t / self.duration * count))
+        key = ('thumb', index)
+        photo = self._cache_get(key)
+        if photo is None:
+            # Thumbnails are padded to fill their cell; crop the picture back out so it lines up with decoded frames
+            width, height = fit_size(*self.frame_size, THUMB_WIDTH, THUMB_HEIGHT)
+            x = (index % SPRITE_COLUMNS) * THUMB_WIDTH + (THUMB_WIDTH - width) // 2
+            y = (index // SPRITE_COLUMNS) * THUMB_HEIGHT + (THUMB_HEIGHT - height) // 2
+            thumb = self._sheet.crop((x, y, x + width, y + height))
+            photo = ImageTk.PhotoImage(thumb.resize(self.frame_size, Image.BILINEAR))
+            self._cache_put(key, photo)
+        return photo
+
+    def scrub(self, t):
+        """Follow the scrubber: a thumbnail now, the exact frame once it rests."""
+        if not self.video_path or not self.frame_size:
+            return
+        self.position = self.snap(t)
+        photo = self._cache_get(('frame', self._source(), self.position)) or self._thumbnail(t)
+        if photo is not None:
+            self._draw(photo)
+        if self._settle_id is not None:
+            self.canvas.after_cancel(self._settle_id)
+        self._settle_id = self.canvas.after(SCRUB_SETTLE_MS, self._settled)
+
+    def _settled(self):
+        self._settle_id = None
+        self.show(self.position)
+
+    def _source(self):
+        return self._proxy or self.video_path
+
+    def show(self, t):
+        """Show the decoded frame nearest ``t``: exact on the proxy, at a keyframe on the source."""
+        if not self.video_path or not self.frame_size:
+            return
+        self.position = self.snap(t)
+        photo = self._cache_get(('frame', self._source(), self.position))
+        if photo is not None:
+            self._draw(photo)
+            return
+        self._wanted = self.position
+        self._decode()
+
+    def _decode(self):
+        generation, video_path, target = self._generation, self._source(), self._wanted
+        if target is None or self.jobs.is_running("preview_decode"):
+            # The running decode picks up the latest target when it finishes
+            return
+        self._wanted = None
+        frame_size = self.frame_size
+        frame_rate = self._frame_rate(self.video_path)
+
+        def work():
+            decoder = self._decoder
+            if decoder is None or decoder.video_path != video_path:
+                if decoder is not None:
+                    decoder.close()
+                decoder = self._decoder = FrameDecoder(video_path, *frame_size, frame_rate)
+            return decoder.frame_at(target)
+
+        def done(image):
+            if generation == self._generation:
+                photo = ImageTk.PhotoImage(image)
+                self._cache_put(('frame', video_path, target), photo)
+                if target == self.position:
+                    self._draw(photo)
+            self._decode()
+
+        def failed(e):
+            self.show_error(e)
+            self._decode()
+
+        self.jobs.submit("preview_decode", work, on_done=done, on_error=failed)
+
+    def _frame_rate(self, video_path):
+        if video_path not in self._frame_rates:
+            video_stream = media_cache.video_stream(video_path) or {}
+            rate = video_stream.get('avg_frame_rate') or video_stream.get('r_frame_rate') or '25/1'
+            numerator, _, denominator = rate.partition('/')
+            try:
+                self._frame_rates[video_path] = float(numerator) / float(denominator or 1) or 25.0
+            except (ValueError, ZeroDivisionError):
+                self._frame_rates[video_path] = 25.0
+        return self._frame_rates[video_path]
+
+    def set_edit(self, recipe):
+        """Draw ``recipe``'s crop, text and image over the preview, as the full render will place them."""
+        self._recipe = recipe
+        if self._edit_id is not None:
+            self.canvas.after_cancel(self._edit_id)
+        self._edit_id = self.canvas.after(EDIT_SETTLE_MS, self._draw_edit)
+
+    def _draw_overlay(self, png_path, x, y, bounds, scale):
+        """Place an overlay PNG at source position ``(x, y)``, clipped to ``bounds`` like the render clips it."""
+        left, top, right, bottom = bounds
+        with Image.open(png_path) as image:
+            box = (max(0, left - x), max(0, top - y), min(image.width, right - x), min(image.height, bottom - y))
+            if box[2] <= box[0] or box[3] <= box[1]:
+                return
+            visible = image.convert('RGBA').crop(box)
+        size = (max(1, round(visible.width * scale)), max(1, round(visible.height * scale)))
+        photo = ImageTk.PhotoImage(visible.resize(size, Image.BILINEAR))
+        self._edit_images.append(photo)
+        self.canvas.create_image((x + box[0]) * scale, (y + box[1]) * scale, anchor='nw', image=photo, tags="edit")
+
+    def _draw_edit(self):
+        self._edit_id = None
+        self.canvas.delete("edit")
+        self._edit_images = []
+        if not self.frame_size or not self.source_size:
+            return
+        recipe = self._recipe
+        scale = self.frame_size[0] / self.source_size[0]
+        source_width, source_height = self.source_size
+        bounds = (0, 0, source_width, source_height)
+        try:
+            if recipe.get('crop'):
+                x, y, width, height = resolve_crop(recipe['crop'], source_width, source_height,
+                                                   recipe.get('preserve_aspect', False))
+                bounds = (x, y, x + width, y + height)
+                frame_width, frame_height = self.frame_size
+                left, top, right, bottom = (value * scale for value in bounds)
+                for shade in ((0, 0, frame_width, top), (0, bottom, frame_width, frame_height),
+                              (0, top, left, bottom), (right, top, frame_width, bottom)):
+                    self.canvas.create_rectangle(*shade, fill="black", stipple="gray50", width=0, tags="edit")
+                self.canvas.create_rectangle(left, top, right, bottom, outline=CROP_OUTLINE, dash=(4, 2), tags="edit")
+            # Text and image positions are relative to the cropped frame, as in edit_graph.apply_video_recipe
+            text = recipe.get('text')
+            if text and text.get('text'):
+                png_path = overlay_assets.text(text['text'], text.get('font'), text.get('font_size', 24),
+                                               text.get('color', 'white'))
+                self._draw_overlay(png_path, bounds[0] + max(0, int(text.get('x', 10))),
+                                   bounds[1] + max(0, int(text.get('y', 10))), bounds, scale)
+            image = recipe.get('image')
+            if image and os.path.exists(image.get('path', '')):
+                png_path = overlay_assets.image(image['path'], image.get('width'), image.get('scale', 1.0))
+                self._draw_overlay(png_path, bounds[0] + max(0, int(image.get('x', 0))),
+                                   bounds[1] + max(0, int(image.get('y', 0))), bounds, scale)
+        except Exception as e:
+            logging.warning(f"Could not draw edit preview: {str(e)}")
+
+    def show_error(self, e):
+        self.canvas.delete("frame")
+        self.canvas.create_text(self.width / 2, self.height / 2, text=f"Preview Error: {str(e)}",
+                                fill="white", font=("Arial", 10), tags="frame")
+
+    def close(self):
+        self._generation += 1
+        self.video_path = None
+        for kind in ("load", "sheet", "proxy"):
+            self.jobs.cancel(f"preview_{kind}")
+        if self._decoder is not None:
+            self._decoder.close()
+            self._decoder = None
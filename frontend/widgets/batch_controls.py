@@ -0,0 +1,43 @@
+import tkinter as tk
+from ttkbootstrap import ttk
+from ttkbootstrap.constants import *
+
+class BatchControlsWidget(ttk.Frame):
+    def __init__(self, parent, event_handler):
+        super().__init__(parent)
+        self.event_handler = event_handler
+        self.create_widgets()
+
+    def create_widgets(self):
+        ttk.Label(self, text="Videos (folder or glob pattern):", bootstyle=SECONDARY).pack(pady=5)
+        self.batch_source = tk.StringVar(value="videos")
+        source_entry = ttk.Entry(self, textvariable=self.batch_source, width=50, bootstyle=DEFAULT)
+        source_entry.pack(pady=5)
+        if self.event_handler.ui:  # Check if ui is set
+            self.event_handler.ui.add_context_menu(source_entry)  # Add context menu
+        ttk.Button(self, text="Select Folder", command=self.event_handler.select_batch_folder, bootstyle=INFO).pack(pady=5)
+
+        ttk.Label(self, text="Recipe (empty uses the current Crop and Overlay settings):", bootstyle=SECONDARY).pack(pady=5)
+        self.recipe_path = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.recipe_path, wraplength=650, font=("Arial", 8), bootstyle=INFO).pack(pady=5)
+        recipe_frame = ttk.Frame(self)
+        recipe_frame.pack(pady=5)
+        ttk.Button(recipe_frame, text="Load Recipe", command=self.event_handler.load_batch_recipe, bootstyle=INFO).pack(side=LEFT, padx=5)
+        ttk.Button(recipe_frame, text="Save Current as Recipe", command=self.event_handler.save_batch_recipe, bootstyle=INFO).pack(side=LEFT, padx=5)
+
+        jobs_frame = ttk.Frame(self)
+        jobs_frame.pack(pady=5)
+        self.batch_jobs = tk.StringVar(value="")
+        self.batch_threads = tk.StringVar(value="")
+        ttk.Label(jobs_frame, text="Jobs:", bootstyle=SECONDARY).grid(row=0, column=0, padx=5)
+        jobs_entry = ttk.Entry(jobs_frame, textvariable=self.batch_jobs, width=10, bootstyle=DEFAULT)
+        jobs_entry.grid(row=0, column=1, padx=5)
+        if self.event_handler.ui:  # Check if ui is set
+            self.event_handler.ui.add_context_menu(jobs_entry)  # Add context menu
+        ttk.Label(jobs_frame, text="Threads/job:", bootstyle=SECONDARY).grid(row=0, column=2, padx=5)
+        threads_entry = ttk.Entry(jobs_frame, textvariable=self.batch_threads, width=10, bootstyle=DEFAULT)
+        threads_entry.grid(row=0, column=3, padx=5)
+        if self.event_handler.ui:  # Check if ui is set
+            self.event_handler.ui.add_context_menu(threads_entry)  # Add context menu
+
+        ttk.Button(self, text="Render Batch", command=self.event_handler.batch_render, bootstyle=PRIMARY).pack(pady=5)
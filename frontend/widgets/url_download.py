@@ -28,4 +28,7 @@ class URLDownloadWidget(ttk.Frame):
         ttk.Label(options_frame, text="Extension:", bootstyle=SECONDARY).pack(side=LEFT, padx=5)
         ttk.Combobox(options_frame, textvariable=self.extension, values=[".mp4", ".webm", ".mkv"], width=10, state="readonly", bootstyle=DEFAULT).pack(side=LEFT, padx=5)
 
+        self.clips_only = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self, text="Download 60s clips only", variable=self.clips_only, bootstyle=PRIMARY).pack(pady=5)
+
         ttk.Button(self, text="Download", command=self.event_handler.download_from_url, bootstyle=PRIMARY).pack(pady=5)
\ No newline at end of file
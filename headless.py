@@ -0,0 +1,69 @@
+import sys
+import argparse
+from backend.pipeline import Pipeline, JsonLinesEmitter, load_recipe
+from backend.batch_render import BatchRenderer, BATCH_OUTPUT_DIR, collect_inputs, load_edit_recipe
+
+# Headless entry point: runs the search/download/split/edit/upload pipeline
+# from a JSON recipe without importing tkinter. Pillow is only loaded when a
+# recipe has text or image overlays.
+#
+#   python headless.py recipe.json [--metrics-file metrics.jsonl]
+#
+# Example recipe:
+#   {
+#     "search": {"queries": "default", "results_length": 10, "workers": 4, "target_new": 20},
+#     "download": {"max_downloads": 10, "workers": 3, "filter": {"min_views": 1000}},
+#     "split": {"max_duration": 60, "smart_cut": false, "workers": 2},
+#     "edit": {"crop_params": [0, 0, 1080, 1920], "color_params": [1.0, 1.1, 1.2], "workers": 2},
+#     "upload": {"page_id": "123", "access_token_env": "FACEBOOK_ACCESS_TOKEN", "workers": 1}
+#   }
+#
+# With --batch the recipe is an edit recipe (see backend/edit_graph.py) that is
+# applied to every video in a folder or glob on a process pool:
+#
+#   python headless.py edit_recipe.json --batch "videos/*.mp4" [--jobs 4 --threads 4]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the video pipeline without the GUI.")
+    parser.add_argument("recipe", help="Path to a JSON recipe file")
+    parser.add_argument("--metrics-file", help="Write progress and metrics JSON lines here instead of stdout")
+    parser.add_argument("--batch", metavar="SOURCE", help="Apply an edit recipe to every video in a folder or glob")
+    parser.add_argument("--jobs", type=int, help="Concurrent batch render jobs (default: cores / threads)")
+    parser.add_argument("--threads", type=int, help="ffmpeg threads per batch render job")
+    parser.add_argument("--output-dir", default=BATCH_OUTPUT_DIR, help="Where batch renders are written")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        return run_batch(args)
+
+    recipe = load_recipe(args.recipe)
+    search = recipe.get("search")
+    if search and search.get("queries", "default") == "default":
+        from frontend.config import SEARCH_QUERIES
+        search["queries"] = SEARCH_QUERIES
+
+    stream = open(args.metrics_file, "a") if args.metrics_file else sys.stdout
+    try:
+        Pipeline(recipe, emit=JsonLinesEmitter(stream)).run()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
+
+def run_batch(args):
+    stream = open(args.metrics_file, "a") if args.metrics_file else sys.stdout
+    emit = JsonLinesEmitter(stream)
+    try:
+        inputs = collect_inputs(args.batch)
+        renderer = BatchRenderer(args.jobs, args.threads, args.output_dir)
+        summary = renderer.run(load_edit_recipe(args.recipe), inputs,
+                               progress_callback=lambda message: emit("log", stage="batch", message=message),
+                               progress_updater=lambda percent: emit("progress", stage="batch", percent=round(percent, 1)))
+        emit("batch_done", **{key: value for key, value in summary.items() if key != "recipe"})
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0 if summary['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
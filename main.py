@@ -8,4 +8,5 @@ if __name__ == "__main__":
     app = VideoSearchDownloadUI(root, event_handler)
     event_handler.ui = app  # Set ui before widgets are created
     event_handler.update_video_info()
+    event_handler.warm_media_cache()
     root.mainloop()
\ No newline at end of file